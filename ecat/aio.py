@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import functools
+import cx_Oracle
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, Optional, Callable, Any
+from ecat.db import Connections
+from ecat.tables import reimport_log, reimport, product_code, analysis_stage
+from ecat.ecat import classroom_upload, classroom_analyse, classroom_run
+from ecat.planner import execution_plan
+
+logger = logging.getLogger(__name__)
+
+# Bounded executor for blocking (database) I/O, see get_executor()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor(max_workers: Optional[int]=None) -> ThreadPoolExecutor:
+    ''' Return the (shared) bounded executor used for blocking I/O
+
+    Parameters
+    ----------
+    max_workers
+        Default None (4). Maximum number of concurrently running blocking
+        calls, i.e. catalogue jobs / database calls. Only used when the
+        executor is first created.
+
+    Returns
+    -------
+    ThreadPoolExecutor
+    '''
+    global _executor
+
+    if _executor is None:
+        max_workers = max_workers or 4
+        _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ecat_io')
+        logger.info(f'Async executor: {max_workers} workers')
+
+    return _executor
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    ''' Run blocking function in the bounded executor, without blocking the event loop '''
+
+    loop = asyncio.get_running_loop()
+
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+async def get_connection(database: str, filename: Optional[str]=None) -> Optional[cx_Oracle.Connection]:
+    ''' Open connection to database (connections.json entry) '''
+
+    connections = await run_blocking(Connections, filename)
+
+    return await run_blocking(connections.get_connection, database)
+
+
+async def classroom_upload_async(filename: Path, database: str='eCatalogDEV',
+        last_update: Union[None, str]=None, update: bool=False,
+        connection: Optional[cx_Oracle.Connection]=None,
+        direct_path: bool=False, batch_size: Optional[int]=None,
+        plan: Union[bool, execution_plan]=True) -> bool:
+    ''' Async counterpart of classroom_upload(), see ecat.ecat.classroom_upload
+
+    The upload runs in the bounded executor. Several uploads (each with
+    its own connection) can run concurrently.
+    '''
+    return await run_blocking(classroom_upload, filename, database=database,
+                              last_update=last_update, update=update,
+                              connection=connection, direct_path=direct_path,
+                              batch_size=batch_size, plan=plan)
+
+
+async def classroom_analyse_async(filename: Path, database: str='eCatalogDEV',
+        last_update: Union[None, str]=None,
+        connection: Optional[cx_Oracle.Connection]=None,
+        snapshot: bool=False, server_side: bool=False,
+        processes: Optional[int]=None, parallel_output: Optional[bool]=True,
+        incremental: bool=False, plan: Union[bool, execution_plan]=True) -> None:
+    ''' Async counterpart of classroom_analyse(), see ecat.ecat.classroom_analyse
+
+    Runs in the bounded executor. Excel workbook writes (serialisation
+    holds the GIL and would stall the event loop) are offloaded to worker
+    processes by default (parallel_output=True, unlike the sync version).
+    Analysis/compare partitions run in worker processes if planned (large
+    files, see ecat.planner) or processes > 1.
+    '''
+    await run_blocking(classroom_analyse, filename, database=database,
+                       last_update=last_update, connection=connection,
+                       snapshot=snapshot, server_side=server_side,
+                       processes=processes, parallel_output=parallel_output,
+                       incremental=incremental, plan=plan)
+
+
+async def classroom_run_async(filename: Path, database: str='eCatalogDEV',
+        last_update: Union[None, str]=None, update: bool=False,
+        render: bool=True, parallel_output: Optional[bool]=True,
+        connection: Optional[cx_Oracle.Connection]=None,
+        processes: Optional[int]=None, direct_path: bool=False,
+        plan: Union[bool, execution_plan]=True) -> bool:
+    ''' Async counterpart of classroom_run(), see ecat.ecat.classroom_run
+
+    Runs in the bounded executor. As classroom_analyse_async(), Excel
+    workbook writes are offloaded to worker processes by default.
+    '''
+    return await run_blocking(classroom_run, filename, database=database,
+                              last_update=last_update, update=update, render=render,
+                              parallel_output=parallel_output, connection=connection,
+                              processes=processes, direct_path=direct_path, plan=plan)
+
+
+class async_table():
+    ''' Class to wrap a tables class (instance) for use from asyncio
+
+    Every method call becomes a coroutine, run in the bounded executor.
+    Calls on the same wrapper are serialised, as a database connection
+    must not be used by two threads at the same time. Use one connection
+    per concurrently running job.
+
+    Example
+    -------
+    con = await get_connection('eCatalogDEV')
+    log_table = await async_table.create(reimport_log, connection=con)
+    last_updated = await log_table.get_last_update()
+
+    '''
+
+    def __init__(self, table: Union[reimport_log, reimport, product_code, analysis_stage]) -> None:
+        '''
+        Parameters
+        ----------
+        table
+            tables class instance, e.g. reimport_log(connection=con)
+
+        Returns
+        -------
+        None
+
+        '''
+        self.table = table
+        self._lock = asyncio.Lock()
+
+
+    @classmethod
+    async def create(cls, table_class: type, *args, **kwargs) -> 'async_table':
+        ''' Construct tables class in the executor (product_code fetches on construction) '''
+
+        return cls(await run_blocking(table_class, *args, **kwargs))
+
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.table, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def method(*args, **kwargs) -> Any:
+            async with self._lock:
+                return await run_blocking(attr, *args, **kwargs)
+
+        return method
@@ -1,19 +1,23 @@
+import numpy as np
 import pandas as pd
 import logging
-from ecat.xl import write_excel
+from typing import Optional, Tuple, Dict
+from pandas.api.types import is_bool_dtype, is_numeric_dtype, is_datetime64_any_dtype
+from ecat.xl import write_excel, excel_scheduler
 from ecat.constants import STATUS
 
 logger = logging.getLogger(__name__)
 
 def generate_analysis(df_classroom: pd.DataFrame, df_product: pd.DataFrame,
                       df_p_product: pd.DataFrame,
-                      filename: str='outputs/ECAT_Classroom_Item_Analysis.xlsx') -> pd.DataFrame:
+                      filename: Optional[str]='outputs/ECAT_Classroom_Item_Analysis.xlsx',
+                      scheduler: Optional[excel_scheduler]=None) -> pd.DataFrame:
     '''
     Create a dataframe summarising the class_room item code, its 'status'
     and the corresponding information of whether the item exists in the
     product and p_product (published) eCatalogue data tables.
 
-    Export results to an Excel WorkBook.
+    Export results to an Excel WorkBook (and typed parquet sidecar).
 
     Parameters
     ----------
@@ -23,6 +27,10 @@ def generate_analysis(df_classroom: pd.DataFrame, df_product: pd.DataFrame,
         product data(frame) from eCatalogue
     df_p_product
         published product data(frame) from eCatalogue
+    filename
+        Excel output file name. If None, no workbook is written.
+    scheduler
+        Default None. If given, workbook is written by the excel_scheduler.
 
     Returns
     -------
@@ -34,6 +42,35 @@ def generate_analysis(df_classroom: pd.DataFrame, df_product: pd.DataFrame,
 
     classroom_merged_products = classroom_products.merge(classroom_p_products, how='left')
 
+    return analysis_summary(df_classroom, classroom_merged_products, filename=filename,
+                            scheduler=scheduler)
+
+
+def analysis_summary(df_classroom: pd.DataFrame, df_flags: pd.DataFrame,
+                     filename: Optional[str]='outputs/ECAT_Classroom_Item_Analysis.xlsx',
+                     scheduler: Optional[excel_scheduler]=None) -> pd.DataFrame:
+    '''
+    Add classroom item details to item existence flags (PRODUCT, P_PRODUCT)
+    and export results to an Excel WorkBook.
+
+    Parameters
+    ----------
+    df_classroom
+        'classroom' item dataframe (converted from CSV)
+    df_flags
+        PRODUCTCODE_ID, PRODUCT, P_PRODUCT dataframe in the same
+        (row) order as df_classroom
+    filename
+        Excel output file name. If None, no workbook is written.
+    scheduler
+        Default None. If given, workbook is written by the excel_scheduler.
+
+    Returns
+    -------
+    Pandas DataFrame
+    '''
+    classroom_merged_products = df_flags
+
     # Add Baxter product code, product name, status and description.
     classroom_merged_products.insert(1, 'BAXTER_PRODUCTCODE', df_classroom.BAXTER_PRODUCTCODE)
     classroom_merged_products.insert(2, 'PRODUCT_NAME', df_classroom.PRODUCT_NAME)
@@ -41,11 +78,13 @@ def generate_analysis(df_classroom: pd.DataFrame, df_product: pd.DataFrame,
 
     # Add status description
     s = STATUS()
-    desc = classroom_merged_products['ARTICLE_STATUS'].replace(to_replace=s.status)
+    desc = s.to_categorical(classroom_merged_products['ARTICLE_STATUS'])
     classroom_merged_products.insert(4, 'STATUS_DESC', desc)
 
     # Generate analysis Excel WorkBook
-    write_excel(classroom_merged_products, filename=filename)
+    if filename is not None:
+        write_excel(classroom_merged_products, filename=filename, scheduler=scheduler,
+                    sidecar=True)
 
     return classroom_merged_products
 
@@ -87,7 +126,8 @@ def classroom_lookup(df_classroom: pd.DataFrame, df_product: pd.DataFrame,
 
 def compare_data(df1: pd.DataFrame, df2: pd.DataFrame, df_classroom: pd.DataFrame,
                  table1: str='self', table2: str='other',
-                 filename: str='outputs/ECAT_Compare.xlsx') -> pd.DataFrame:
+                 filename: Optional[str]='outputs/ECAT_Compare.xlsx',
+                 scheduler: Optional[excel_scheduler]=None) -> pd.DataFrame:
     ''' Wrapper function for dataframe.compare()
 
     Compare classroom dataframe vs product / p_product data
@@ -99,7 +139,7 @@ def compare_data(df1: pd.DataFrame, df2: pd.DataFrame, df_classroom: pd.DataFram
     append product_id and baxter_productcode columns. This is to
     make it easier to identify product information.
 
-    Export results to an Excel WorkBook.
+    Export results to an Excel WorkBook (and typed parquet sidecar).
 
     Parameters
     ----------
@@ -113,13 +153,19 @@ def compare_data(df1: pd.DataFrame, df2: pd.DataFrame, df_classroom: pd.DataFram
         table1 label secondary heading label name
     table2
         table2 label secondary heading label name
+    filename
+        Excel output file name. If None, no workbook is written.
+    scheduler
+        Default None. If given, workbook is written by the excel_scheduler.
 
     Returns
     -------
     Comparison pandas dataframe
     '''
+    df1, df2 = normalize_types(df1, df2)
     df_compare = df1.compare(df2, align_axis=0)
     df_compare = df_compare.reset_index().set_index('level_0')
+    logger.info(f'{table1} vs {table2}: {df_compare.index.nunique()} rows differ')
 
     product_id = df_classroom['PRODUCTCODE_ID']
     df_compare.insert(0, 'PRODUCTCODE_ID', product_id)
@@ -131,6 +177,155 @@ def compare_data(df1: pd.DataFrame, df2: pd.DataFrame, df_classroom: pd.DataFram
     replacements = {'self': table1.upper(), 'other':table2.upper()}
     df_compare.TABLE_NAME = df_compare.TABLE_NAME.replace(to_replace=replacements)
 
-    write_excel(df_compare, filename=filename, freeze_panes=(1,3))
+    if filename is not None:
+        write_excel(df_compare, filename=filename, freeze_panes=(1,3),
+                    scheduler=scheduler, sidecar=True)
 
     return df_compare
+
+
+def compare_environments(frames: Dict[str, pd.DataFrame], table_name: str='PRODUCT',
+                         filename: Optional[str]='outputs/ECAT_Environment_Drift.xlsx',
+                         scheduler: Optional[excel_scheduler]=None) -> pd.DataFrame:
+    ''' Compare product (or p_product) data between eCatalogue environments
+
+    The first environment is the baseline, each other environment is
+    compared with it on PRODUCTCODE_ID, BAXTER_PRODUCTCODE. Items found in
+    both with different values are reported as 'CHANGED' (one row per
+    environment, differing columns only), items found in one environment
+    only as 'ONLY IN <environment>'.
+
+    Parameters
+    ----------
+    frames
+        {environment: product data(frame)}, baseline environment first
+    table_name
+        Default 'PRODUCT'. TABLE_NAME column value, e.g. 'PRODUCT' or 'P_PRODUCT'
+    filename
+        Excel output file name. If None, no workbook is written.
+    scheduler
+        Default None. If given, workbook is written by the excel_scheduler.
+
+    Returns
+    -------
+    Cross environment differences pandas dataframe
+    '''
+    key_cols = ['PRODUCTCODE_ID', 'BAXTER_PRODUCTCODE']
+    prepare = lambda df: df.drop_duplicates(subset=key_cols).set_index(key_cols).sort_index()
+
+    (base_name, df_base), *others = frames.items()
+    base = prepare(df_base)
+
+    results = []
+    for name, df in others:
+        other = prepare(df)
+
+        # Items in both environments, with different values
+        common = base.index.intersection(other.index)
+        columns = base.columns.intersection(other.columns)
+        df1, df2 = normalize_types(base.loc[common, columns], other.loc[common, columns])
+
+        df_compare = df1.compare(df2, align_axis=0)
+        if not df_compare.empty:
+            df_compare = df_compare.reset_index()
+            df_compare = df_compare.rename(columns={f'level_{len(key_cols)}': 'ENVIRONMENT'})
+            df_compare.ENVIRONMENT = df_compare.ENVIRONMENT.replace({'self': base_name,
+                                                                     'other': name})
+            df_compare.insert(len(key_cols) + 1, 'DRIFT', 'CHANGED')
+            results.append(df_compare)
+
+        # Items in one environment only
+        for environment, missing in ((base_name, base.index.difference(other.index)),
+                                     (name, other.index.difference(base.index))):
+            df_missing = missing.to_frame(index=False)
+            df_missing['ENVIRONMENT'] = environment
+            df_missing['DRIFT'] = f'ONLY IN {environment}'
+            results.append(df_missing)
+
+    df_drift = pd.concat(results, ignore_index=True)
+    df_drift.insert(len(key_cols), 'TABLE_NAME', table_name.upper())
+
+    logger.info(f'{table_name}: {df_drift.PRODUCTCODE_ID.nunique()} items differ '
+                f'between {", ".join(frames)}')
+
+    if filename is not None:
+        write_excel(df_drift, filename=filename, freeze_panes=(1,3),
+                    scheduler=scheduler, sidecar=True)
+
+    return df_drift
+
+
+def normalize_types(df1: pd.DataFrame, df2: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    ''' Cast common columns of both dataframes to one canonical typed representation
+
+    CSV columns (pandas inferred) and eCatalogue columns (driver types) of
+    the same data often differ in type, e.g. int vs float or None vs NaN.
+    Before comparing, both sides are cast to:
+
+    - float64 (NaN for nulls), if either side is numeric and all values of
+      both sides are numbers.
+    - datetime64, if either side is a date and all values of both are dates.
+    - otherwise trimmed strings (blank -> null), as categoricals sharing the
+      same categories, i.e. compared as integer codes.
+
+    Categorical columns are typed by their category values, e.g. flags
+    held as int categories on one side and float on the other are numeric.
+    Boolean columns (both sides) are left as they are.
+    '''
+    df1, df2 = df1.copy(), df2.copy()
+
+    for col in df1.columns.intersection(df2.columns):
+        s1, s2 = _uncategorize(df1[col]), _uncategorize(df2[col])
+
+        if is_bool_dtype(s1) and is_bool_dtype(s2):
+            continue
+
+        if is_datetime64_any_dtype(s1) or is_datetime64_any_dtype(s2):
+            n1, n2 = pd.to_datetime(s1, errors='coerce'), pd.to_datetime(s2, errors='coerce')
+            if _lossless(s1, n1) and _lossless(s2, n2):
+                df1[col], df2[col] = n1, n2
+                continue
+
+        if is_numeric_dtype(s1) or is_numeric_dtype(s2):
+            n1, n2 = _to_number(s1), _to_number(s2)
+            if _lossless(s1, n1) and _lossless(s2, n2):
+                df1[col], df2[col] = n1, n2
+                continue
+
+        t1, t2 = _to_text(s1), _to_text(s2)
+        categories = pd.Index(t1.dropna().unique()).union(pd.Index(t2.dropna().unique()))
+        dtype = pd.CategoricalDtype(categories=categories)
+        df1[col], df2[col] = t1.astype(dtype), t2.astype(dtype)
+
+    return df1, df2
+
+
+def _uncategorize(values: pd.Series) -> pd.Series:
+    ''' Categorical series as a series of its category values (other series as is) '''
+
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        return values
+
+    return pd.Series(np.asarray(values), index=values.index, name=values.name)
+
+
+def _lossless(values: pd.Series, converted: pd.Series) -> bool:
+    ''' Were all (non null) values converted '''
+
+    return bool((converted.notna() | values.isna()).all())
+
+
+def _to_number(values: pd.Series) -> pd.Series:
+    ''' Convert to float64, values that are not numbers become NaN '''
+
+    return pd.to_numeric(values.astype(object), errors='coerce').astype('float64')
+
+
+def _to_text(values: pd.Series) -> pd.Series:
+    ''' Convert to trimmed (object) strings, nulls & blanks become NaN '''
+
+    text = values.astype(object)
+    notna = text.notna()
+    text[notna] = text[notna].astype(str).str.strip()
+
+    return text.where(text != '')
@@ -0,0 +1,181 @@
+import json
+import time
+import logging
+import cx_Oracle
+import psycopg2
+import pandas as pd
+from pathlib import Path
+from typing import Optional, List, Dict
+
+logger = logging.getLogger(__name__)
+
+# Character column types, read as strings (e.g. to keep leading zeros)
+_STRING_TYPES = ('VARCHAR2', 'NVARCHAR2', 'CHAR', 'NCHAR',
+                 'CHARACTER VARYING', 'CHARACTER', 'TEXT')
+
+
+class table_catalog():
+    ''' Class to encapsulate (cached) ecat table metadata
+
+    Column names, types and sizes are reflected once from the data
+    dictionary and cached, both in-process and in a json file, for
+    ttl seconds. The rest of the pipeline uses the catalog rather than
+    probing tables (select * ... where 1=2) on every run.
+
+    Example
+    -------
+    catalog = table_catalog(connection=con)
+    columns = catalog.get_columns('temp_bp_class_reimport_data')
+    dtypes = catalog.get_dtypes('temp_bp_class_reimport_data')
+
+    '''
+
+    # Table metadata keyed by (connection key, table): (reflected time, dataframe)
+    _cache: Dict[tuple, tuple] = {}
+
+    def __init__(self, connection: cx_Oracle.Connection, ttl: int=86400,
+                 filename: str='outputs/ECAT_table_catalog.json') -> None:
+        '''
+        Parameters
+        ----------
+        connection
+            database connection object
+        ttl
+            Default 86400 (1 day). Seconds before cached metadata is
+            reflected again from the database.
+        filename
+            json file used to keep the catalog between runs.
+
+        Returns
+        -------
+        None
+
+        '''
+        self.connection = connection
+        self.ttl = ttl
+        self.filename = Path(filename)
+        self.postgres = isinstance(connection, psycopg2.extensions.connection)
+
+        if self.postgres:
+            self.connection_key = connection.dsn
+        else:
+            self.connection_key = f'{connection.username}@{connection.dsn}'
+
+
+    def get(self, table: str) -> pd.DataFrame:
+        ''' Return table metadata, one row per column (in column order)
+
+        Parameters
+        ----------
+        table
+            table name
+
+        Returns
+        -------
+        dataframe with COLUMN_NAME, DATA_TYPE, DATA_LENGTH,
+        DATA_PRECISION, DATA_SCALE, NULLABLE columns
+        '''
+        key = (self.connection_key, table.upper())
+
+        reflected, df = table_catalog._cache.get(key, (0, None))
+        if df is None or time.time() - reflected > self.ttl:
+            reflected, df = self._read_file(key)
+
+        if df is None or time.time() - reflected > self.ttl:
+            reflected, df = time.time(), self._reflect(table)
+            self._write_file(key, reflected, df)
+
+        table_catalog._cache[key] = (reflected, df)
+
+        return df
+
+
+    def get_columns(self, table: str) -> List[str]:
+        ''' Return table column names (in column order) '''
+
+        return self.get(table)['COLUMN_NAME'].tolist()
+
+
+    def get_dtypes(self, table: str) -> Dict[str, str]:
+        ''' Return pandas dtypes (pd.read_csv dtype=) for character columns '''
+
+        df = self.get(table)
+        df = df[df['DATA_TYPE'].isin(_STRING_TYPES)]
+
+        return {column: 'object' for column in df['COLUMN_NAME']}
+
+
+    def get_input_sizes(self, table: str) -> List[Optional[int]]:
+        ''' Return cursor.setinputsizes() sizes (character columns only)
+
+        Character columns are bound with their maximum length, so that bind
+        buffers are allocated once. Other columns are left to the driver (None).
+        '''
+        df = self.get(table)
+
+        return [int(length) if data_type in _STRING_TYPES else None
+                for data_type, length in zip(df['DATA_TYPE'], df['DATA_LENGTH'])]
+
+
+    def _reflect(self, table: str) -> pd.DataFrame:
+        ''' Read table metadata from the data dictionary '''
+
+        if self.postgres:
+            sql = '''select upper(column_name), upper(data_type),
+                            character_maximum_length, numeric_precision,
+                            numeric_scale, is_nullable
+                     from information_schema.columns
+                     where table_name = %s
+                     order by ordinal_position'''
+            params = [table.lower()]
+        else:
+            sql = '''select column_name, data_type, data_length, data_precision,
+                            data_scale, nullable
+                     from user_tab_columns
+                     where table_name = :1
+                     order by column_id'''
+            params = [table.upper()]
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+
+        columns = ['COLUMN_NAME', 'DATA_TYPE', 'DATA_LENGTH', 'DATA_PRECISION',
+                   'DATA_SCALE', 'NULLABLE']
+        df = pd.DataFrame(rows, columns=columns)
+
+        logger.info(f'{table}: catalog reflected, {df.shape[0]} columns.')
+
+        return df
+
+
+    def _read_file(self, key: tuple) -> tuple:
+        ''' Return (reflected time, metadata) from catalog file '''
+
+        if not self.filename.exists():
+            return 0, None
+
+        with open(self.filename) as f:
+            catalog = json.load(f)
+
+        entry = catalog.get('.'.join(key))
+        if entry is None:
+            return 0, None
+
+        return entry['reflected'], pd.DataFrame(entry['columns'])
+
+
+    def _write_file(self, key: tuple, reflected: float, df: pd.DataFrame) -> None:
+        ''' Save metadata to catalog file '''
+
+        catalog = {}
+        if self.filename.exists():
+            with open(self.filename) as f:
+                catalog = json.load(f)
+
+        catalog['.'.join(key)] = {'reflected': reflected,
+                                  'columns': df.to_dict(orient='records')}
+
+        self.filename.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.filename, 'w') as f:
+            json.dump(catalog, f, indent=4, default=str)
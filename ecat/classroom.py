@@ -1,12 +1,14 @@
 import re
+import hashlib
 import pandas as pd
 import numpy as np
 import logging
-from ecat.xl import write_excel
+from ecat.xl import write_excel, excel_scheduler
 from pathlib import Path
-from ecat.constants import COMMON_COLS
+from ecat.constants import COMMON_COLS, CATEGORICAL_COLS
+from ecat.dates import parse_dates, parse_date
 from datetime import datetime
-from typing import Union, List
+from typing import Union, Optional, List
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +24,9 @@ class artikel():
     '''
 
     def __init__(self, filename:Path, delimiter:str='\t',
-                 encoding: str='utf-8') -> None:
+                 encoding: str='utf-8', dtype: Optional[dict]=None,
+                 chunk_size: Optional[int]=None,
+                 filter_date: Optional[datetime]=None) -> None:
         '''
         Parameters
         ----------
@@ -32,6 +36,15 @@ class artikel():
             Default '\t' (TAB)
         encoding
             Default 'utf-8'
+        dtype
+            Default None (inferred). Column dtypes, e.g. from the table
+            catalog, see table_catalog.get_dtypes()
+        chunk_size
+            Default None (read whole file). If given, read the file in chunks
+            of chunk_size rows and keep only the rows that pass filter_data()
+            (LAST_USER and filter_date), for files that do not fit in memory.
+        filter_date
+            Default None. DATE_LASTMODIFIED filter date (chunk_size only).
 
         Returns
         -------
@@ -40,23 +53,56 @@ class artikel():
         '''
 
         self.filename = filename
-        df = pd.read_csv(self.filename, encoding=encoding,
-                         delimiter=delimiter, na_values='(null)')
+        read_options = dict(encoding=encoding, dtype=dtype, delimiter=delimiter,
+                            na_values='(null)')
 
-        df['DATE_APPROVED'] = pd.to_datetime(df['DATE_APPROVED'])
-        df['DATE_LASTMODIFIED'] = pd.to_datetime(df['DATE_LASTMODIFIED'])
-        df['ARTICLE_STATUS'] = df['ARTICLE_STATUS'].fillna(0).astype(int)
-        df['GHX_STATUS'] = df['GHX_STATUS'].fillna(0).astype(int)
-        df['CSS_STATUS'] = df['CSS_STATUS'].fillna(0).astype(int)
-        df['THERAPIEGRUPPE'] = df['THERAPIEGRUPPE'].fillna(0).astype(int)
+        if chunk_size is None:
+            df = self._convert(pd.read_csv(self.filename, **read_options))
+        else:
+            total_rows = 0
+            chunks = []
+            for chunk in pd.read_csv(self.filename, chunksize=chunk_size, **read_options):
+                total_rows += chunk.shape[0]
+                chunks.append(self._prefilter(self._convert(chunk), filter_date))
+
+            df = pd.concat(chunks, ignore_index=True)
+            logger.info(f'{self.filename}: Read {total_rows} rows in chunks of {chunk_size}, '
+                        f'kept {df.shape[0]} rows (filtered while reading).')
+
+        # Categoricals once all chunks are read, so that categories are shared
+        df = CATEGORICAL_COLS().convert(df)
 
         self.set_common_cols()
 
         self.df = df
+        self.duplicates_dropped = 0
         total_rows, total_cols = self.df.shape
         logger.info(f'{self.filename}: Imported {total_rows} rows, {total_cols} columns.')
 
 
+    def _convert(self, df: pd.DataFrame) -> pd.DataFrame:
+        ''' Convert date & status columns of (a chunk of) the CSV data '''
+
+        df['DATE_APPROVED'] = parse_dates(df['DATE_APPROVED'])
+        df['DATE_LASTMODIFIED'] = parse_dates(df['DATE_LASTMODIFIED'])
+        df['ARTICLE_STATUS'] = df['ARTICLE_STATUS'].fillna(0).astype(int)
+        df['GHX_STATUS'] = df['GHX_STATUS'].fillna(0).astype(int)
+        df['CSS_STATUS'] = df['CSS_STATUS'].fillna(0).astype(int)
+        df['THERAPIEGRUPPE'] = df['THERAPIEGRUPPE'].fillna(0).astype(int)
+
+        return df
+
+
+    def _prefilter(self, df: pd.DataFrame, filter_date: Optional[datetime]) -> pd.DataFrame:
+        ''' Drop rows of a chunk that filter_data() would drop '''
+
+        keep = df['LAST_USER'].astype(str).str.lower() != 'jde_upload_prd'
+        if filter_date is not None:
+            keep &= df['DATE_LASTMODIFIED'] >= pd.Timestamp(filter_date)
+
+        return df[keep]
+
+
     def get_filename_date(self) -> datetime:
         ''' Extract date value from filename  '''
 
@@ -64,13 +110,23 @@ class artikel():
         if not match:
             logger.info(f'{self.filename}: Invalid filename')
         else:
-            parse_format = '%Y%m%d%H%M%S'
-            new_date = datetime.strptime(match[1], parse_format)
+            new_date = parse_date(match[1], source='filename')
 
         return new_date
 
 
-    def filter_data(self, filter_date: datetime=None) -> pd.DataFrame:
+    def get_fingerprint(self) -> str:
+        ''' Return (sha1) fingerprint of the CSV file contents '''
+
+        sha1 = hashlib.sha1()
+        with open(self.filename, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                sha1.update(block)
+
+        return sha1.hexdigest()
+
+
+    def filter_data(self, filter_date: Optional[datetime]=None) -> pd.DataFrame:
         ''' Filter item data based on DATE_LASTMODIFIED '''
 
         # Note: Records where user LAST_USER = 'JDE_Upload_prd' are
@@ -82,21 +138,42 @@ class artikel():
         logger.info(f'{self.filename}: Filtered with query: {query}')
         logger.info(f'{self.filename}: Filtered {total_rows} rows, {total_cols} columns.')
 
-        query = f"DATE_LASTMODIFIED>='{filter_date}'"
-        self.df = self.df.query(query)
+        # Compare native datetime64 values (rather than a date string)
+        if filter_date is not None:
+            self.df = self.df[self.df['DATE_LASTMODIFIED'] >= pd.Timestamp(filter_date)]
 
         # Make sure that productcode_id is numeric/integer
         self.df.PRODUCTCODE_ID = pd.to_numeric(self.df.PRODUCTCODE_ID, errors='ignore')
 
-        self.df = self.df.sort_values('PRODUCTCODE_ID').reset_index(drop=True)
+        if filter_date is not None:
+            total_rows, total_cols = self.df.shape
+            logger.info(f'{self.filename}: Filtered with DATE_LASTMODIFIED >= {pd.Timestamp(filter_date)}')
+            logger.info(f'{self.filename}: Filtered {total_rows} rows, {total_cols} columns.')
 
-        total_rows, total_cols = self.df.shape
-        logger.info(f'{self.filename}: Filtered with query: {query}')
-        logger.info(f'{self.filename}: Filtered {total_rows} rows, {total_cols} columns.')
+        self.df = self.drop_duplicates()
 
         return self.df
 
 
+    def drop_duplicates(self) -> pd.DataFrame:
+        ''' Keep only the latest (DATE_LASTMODIFIED) row per PRODUCTCODE_ID
+
+        Rows with a null PRODUCTCODE_ID are kept, they are reported
+        by invalid_data(). Result is sorted by PRODUCTCODE_ID.
+        '''
+        df = self.df.sort_values(['PRODUCTCODE_ID', 'DATE_LASTMODIFIED'], kind='mergesort')
+
+        duplicated = (df.duplicated('PRODUCTCODE_ID', keep='last')
+                      & df['PRODUCTCODE_ID'].notna())
+        df = df[~duplicated].reset_index(drop=True)
+
+        self.duplicates_dropped = int(duplicated.sum())
+        if self.duplicates_dropped > 0:
+            logger.info(f'{self.filename}: Dropped {self.duplicates_dropped} duplicate PRODUCTCODE_ID rows.')
+
+        return df
+
+
     def get_dataframe(self, common_fields_only:bool=True)-> pd.DataFrame:
 
         if common_fields_only:
@@ -111,8 +188,15 @@ class artikel():
         return dx
 
 
-    def invalid_data(self) -> bool:
-        ''' Determine whether PRODUCTCODE_ID is numeric or not null '''
+    def invalid_data(self, scheduler: Optional[excel_scheduler]=None) -> bool:
+        ''' Determine whether PRODUCTCODE_ID is numeric or not null
+
+        Parameters
+        ----------
+        scheduler
+            Default None. If given, error workbooks are written by the
+            excel_scheduler.
+        '''
 
         invalid_data = False
 
@@ -122,7 +206,7 @@ class artikel():
             invalid_data = True
             logger.info(f'ERROR: Null product_id -> {total_isna} rows')
             filename='outputs/ECAT_null_products.xlsx'
-            write_excel(df_isna, filename=filename)
+            write_excel(df_isna, filename=filename, scheduler=scheduler)
 
         df_not_numeric = self.df.loc[~self.df['PRODUCTCODE_ID'].astype(str).str.isnumeric()]
         total_not_numeric = df_not_numeric.shape[0]
@@ -130,7 +214,7 @@ class artikel():
             invalid_data = True
             logger.info(f'ERROR: Non-numeric product_id -> {total_not_numeric} rows')
             filename='outputs/ECAT_Non_numeric_products.xlsx'
-            write_excel(df_not_numeric, filename=filename)
+            write_excel(df_not_numeric, filename=filename, scheduler=scheduler)
 
         if invalid_data:
             return True
@@ -141,11 +225,21 @@ class artikel():
         return False
 
 
-    def get_keys(self) -> str:
-        ''' Return list of PRODUCTCODE_ID + BAXTER_PRODUCTCODE '''
+    def get_keys(self, as_list: bool=False) -> Union[str, List[str]]:
+        ''' Return list of PRODUCTCODE_ID + BAXTER_PRODUCTCODE
+
+        Parameters
+        ----------
+        as_list
+            Default False, return keys as SQL 'in' list string.
+            If True, return keys as a python list.
+        '''
 
         concated_keys = self.df.PRODUCTCODE_ID.astype(str) +\
                         self.df.BAXTER_PRODUCTCODE.astype(str)
+        if as_list:
+            return concated_keys.tolist()
+
         keys = '(' + ', '.join(list("'" + concated_keys + "'" )) + ')'
 
         return keys
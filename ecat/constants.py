@@ -19,6 +19,25 @@ class STATUS():
     def get(self, key:str) -> str:
         return self.status.get(key)
 
+    def get_code(self, description: str) -> int:
+        ''' Return status code for given status description '''
+        codes = {v: k for k, v in self.status.items()}
+        return codes[description]
+
+    def get_dtype(self) -> pd.CategoricalDtype:
+        ''' Shared categorical (status description) dtype, incl. 'Unknown' '''
+        return pd.CategoricalDtype(categories=list(self.status.values()) + ['Unknown'])
+
+    def to_categorical(self, codes: pd.Series) -> pd.Series:
+        ''' Map status codes to (categorical) status descriptions
+
+        Codes not in status (e.g. 0 for a missing CSV status) are 'Unknown'.
+        '''
+        desc = codes.map(self.status)
+        desc[desc.isna() & codes.notna()] = 'Unknown'
+
+        return desc.astype(self.get_dtype())
+
     def get_dataframe(self) -> pd.DataFrame:
         self.df = pd.DataFrame([self.status]).T.reset_index()
         self.df.columns = ['status', 'status_description']
@@ -49,3 +68,29 @@ class COMMON_COLS():
     def get(self) -> list:
 
         return self.common_cols
+
+
+class CATEGORICAL_COLS():
+    ''' Low cardinality (unit of measure, flag) columns held as categoricals '''
+
+
+    def __init__(self):
+
+        self.uom_cols = ['MINIMUM_STORAGE_TEMPERATURE_UM', 'MAXIMUM_STORAGE_TEMPERATURE_UM',
+                'VOLUME_UOM', 'GAUGE_UOM', 'LENGTH_UOM', 'INFUSION_DURATION_UOM']
+
+        self.flag_cols = ['ANTI_REFLUX', 'DEHP_FREE', 'PVC_FREE', 'LATEX_FREE',
+                'LIPID_RESISTANT', 'NEEDLE_PROTECTOR', 'OVERPOUCH_REQUIRED']
+
+    def get(self) -> list:
+
+        return self.uom_cols + self.flag_cols
+
+    def convert(self, df: pd.DataFrame) -> pd.DataFrame:
+        ''' Convert categorical columns (where present) to 'category' dtype '''
+
+        columns = [col for col in self.get() if col in df.columns]
+        if columns:
+            df[columns] = df[columns].astype('category')
+
+        return df
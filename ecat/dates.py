@@ -0,0 +1,55 @@
+import logging
+import pandas as pd
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Known (fixed) date formats, per source
+DATE_FORMATS = {'classroom': '%Y-%m-%d %H:%M:%S',  # class.room CSV export columns
+                'filename': '%Y%m%d%H%M%S',        # export_artikel_<date>.csv
+                'override': '%Y%m%d'}              # manual last_update override
+
+
+def parse_dates(values: pd.Series, source: str='classroom') -> pd.Series:
+    ''' Convert (string) values to datetime64, using the source's fixed format
+
+    Fixed format conversion is vectorized. Should any value not match the
+    format, those values only are converted (slowly) by format inference.
+
+    Parameters
+    ----------
+    values
+        pandas series of date strings
+    source
+        Default 'classroom'. DATE_FORMATS key.
+
+    Returns
+    -------
+    datetime64 pandas series
+    '''
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+
+    dates = pd.to_datetime(values, format=DATE_FORMATS[source], errors='coerce')
+
+    unparsed = dates.isna() & values.notna()
+    if unparsed.any():
+        logger.info(f'{values.name}: {unparsed.sum()} values not in format '
+                    f'{DATE_FORMATS[source]!r}, inferring format.')
+        dates[unparsed] = pd.to_datetime(values[unparsed])
+
+    return dates
+
+
+def parse_date(value: str, source: str='filename') -> datetime:
+    ''' Convert single date string to datetime, using the source's fixed format '''
+
+    return datetime.strptime(value, DATE_FORMATS[source])
+
+
+def to_db_dates(values: pd.Series) -> pd.Series:
+    ''' Convert datetime64 series to (object) datetimes for DB binding, NaT -> None '''
+
+    values = values.astype(object)
+
+    return values.where(values.notna(), None)
@@ -13,7 +13,7 @@ class Connections():
     ''' Connections class to encapsulate connecting to databases '''
 
 
-    def __init__(self, filename:str=None) -> None:
+    def __init__(self, filename: Optional[str]=None) -> None:
         '''
         Parameters
         ----------
@@ -1,14 +1,25 @@
+import copy
 import pandas as pd
 import logging
-from typing import Union
+import cx_Oracle
+from typing import Union, Optional, List, Tuple
 from pathlib import Path
-from ecat.tables import reimport_log, reimport, product_code
+from concurrent.futures import ThreadPoolExecutor
+from ecat.tables import reimport_log, analysis_stage, product_code
 from ecat.db import Connections
-from ecat.classroom import artikel
-from ecat.analysis import generate_analysis, compare_data
+from ecat.analysis import generate_analysis, analysis_summary, compare_data, compare_environments
+from ecat.parallel import parallel_compare, compare_frames
+from ecat.incremental import analysis_cache
+from ecat.xl import write_excel, excel_scheduler, read_excel_columns
+from ecat.sidecar import read_sidecar
 from ecat.sql import get_template_config, render_sql, series_to_str
+from ecat.watch import watcher
+from ecat.history import export_history
+from ecat.classroom import artikel
+from ecat.pipeline import run_context
+from ecat.planner import execution_plan
+from ecat.constants import STATUS
 from ecat.version import __version__
-from datetime import datetime
 
 import warnings
 warnings.filterwarnings("ignore")
@@ -24,7 +35,10 @@ logger.info(f'ecat version {__version__}')
 
 
 def classroom_upload(filename: Path, database: str='eCatalogDEV',
-        last_update: Union[None, str]=None, update: bool=False) -> None:
+        last_update: Union[None, str]=None, update: bool=False,
+        connection: Optional[cx_Oracle.Connection]=None,
+        direct_path: bool=False, batch_size: Optional[int]=None,
+        plan: Union[bool, execution_plan]=True) -> bool:
     ''' Upload classroom item data to the Baxter eCatalogue database.
 
     The function attempts to capture the process of updating the e-Catalogue
@@ -44,6 +58,10 @@ def classroom_upload(filename: Path, database: str='eCatalogDEV',
     - match what is already identified in the CSV data file.
 
     - If no 'missing data' in the CSV, upload the CSV to the reimport table.
+      The upload is committed in batches and checkpointed, re-running a
+      failed upload of the same file resumes from the last committed batch.
+
+    - Once the final batch is committed, update the reimport log table.
 
 
     Parameters
@@ -60,11 +78,26 @@ def classroom_upload(filename: Path, database: str='eCatalogDEV',
     update
         Default False. If True, upload/merge CSV data with reimport table.
         Update 'last updated' on reimport log table with filename date.
+    connection
+        Default None. If None, open a new connection to database.
+        Pass an existing connection to re-use it (e.g. in watch mode).
+    direct_path
+        Default False. If True, bulk load the reimport table with direct-path
+        inserts, indexes/constraints are rebuilt after the load (see
+        tables.reimport.upload). Intended for full reloads.
+    batch_size
+        Default None (planned). Number of rows per upload batch/commit.
+    plan
+        Default True. If True, plan fetch/batch sizes from the file size,
+        rows, memory and CPUs (see ecat.planner.execution_plan), explicit
+        arguments override the plan. An execution_plan can also be given.
+        If False, use fixed defaults.
 
 
     Returns
     -------
-    None
+    True if the run completed (uploaded, or nothing to upload), False if
+    the data is invalid or the upload did not complete.
 
 
     Example
@@ -76,57 +109,72 @@ def classroom_upload(filename: Path, database: str='eCatalogDEV',
     classroom_upload(filename=filename, database='eCatalogDEV',
                     last_update='20211102', update=True)
     '''
-    connections = Connections()
-    con = connections.get_connection(database)
-    if con is None:
-        return
+    plan_ = _get_plan(filename, plan, upload_batch_size=batch_size)
+    ctx = run_context(filename, database=database, last_update=last_update,
+                      connection=connection, plan=plan_)
+    if ctx.connection is None:
+        return False
 
-    if last_update is None:
-        log_table = reimport_log(connection=con)
-        last_updated = log_table.get_last_update()
-    else:
-        last_updated = datetime.strptime(last_update, '%Y%m%d')
-        logger.info('')
-        logger.info('<< ::TEST:: RE-IMPORT DATE - MANUAL OVERRIDE >>')
+    return _upload(ctx, update=update, direct_path=direct_path)
+
+
+def _upload(ctx: run_context, update: bool=False, direct_path: bool=False) -> bool:
+    ''' classroom_upload() steps 1-4, using (memoized) run context
+
+    Returns True if completed (uploaded, or nothing to upload), False if
+    the data is invalid or the upload did not complete.
+    '''
 
     logger.info('')
     logger.info('1. Import classroom data, filter')
-    classroom_data = artikel(filename)
-    csv_file_date = classroom_data.get_filename_date()
+    last_updated = ctx.last_updated
+    csv_file_date = ctx.classroom_data.get_filename_date()
     if csv_file_date < last_updated:
         msg = f'CSV file date {csv_file_date} < last DB update {last_updated}'
         logger.info(msg)
         logger.info(f'NO UPDATE TO eCatalogue database.')
-        return
+        return True
 
-    df = classroom_data.filter_data(filter_date=last_updated)
-    if classroom_data.invalid_data():
-        return
+    df = ctx.df_classroom
+    if ctx.invalid:
+        return False
 
     logger.info('')
     logger.info('2. Get Reimport table meta-data')
-    reimport_table = reimport(connection=con)
+    reimport_table = ctx.reimport_table
     reimport_columns = reimport_table.get_columns()
     if list(df.columns) != list(reimport_columns):
         msg = f'Error: CSV cols {len(df.columns)} <> Re-import cols {len(reimport_columns)}'
         logger.info(msg)
-        return
+        return False
 
     if not update:
         logger.info('<< ::TEST:: NO UPDATES MADE >>')
-    else:
-        logger.info('')
-        logger.info('3. Upload classroom item data')
-        reimport_table.upload(df)
+        return True
 
-        logger.info('')
-        logger.info('4. Update reimport_log with last update')
-        log_table = reimport_log(connection=con)
-        log_table.insert(last_updated)
+    logger.info('')
+    logger.info('3. Upload classroom item data')
+    fingerprint = f'{ctx.classroom_data.get_fingerprint()}:{last_updated:%Y%m%d%H%M%S}'
+    batch_size = 10000 if ctx.plan is None else ctx.plan.upload_batch_size
+    if not reimport_table.upload(df, fingerprint=fingerprint, batch_size=batch_size,
+                                 direct_path=direct_path):
+        logger.info('NO UPDATE TO reimport_log, upload incomplete.')
+        return False
+
+    logger.info('')
+    logger.info('4. Update reimport_log with last update')
+    log_table = reimport_log(connection=ctx.connection)
+    log_table.insert(last_updated)
+
+    return True
 
 
 def classroom_analyse(filename: Path, database: str='eCatalogDEV',
-        last_update: Union[None, str]=None) -> None:
+        last_update: Union[None, str]=None,
+        connection: Optional[cx_Oracle.Connection]=None,
+        snapshot: bool=False, server_side: bool=False,
+        processes: Optional[int]=None, parallel_output: Optional[bool]=None,
+        incremental: bool=False, plan: Union[bool, execution_plan]=True) -> None:
     '''  Analyse classroom item data before updating Baxter eCatalogue database.
 
     This function analyses/compares classroom item data.
@@ -154,6 +202,34 @@ def classroom_analyse(filename: Path, database: str='eCatalogDEV',
         Default None. If None, use the last_update from reimport log table.
         Can be specified to manually override reimport log table value or
         used for testing.
+    connection
+        Default None. If None, open a new connection to database.
+        Pass an existing connection to re-use it (e.g. in watch mode).
+    snapshot
+        Default False. If True, incrementally refresh local productcode and
+        p_productcode snapshots (see ecat.snapshot) and lookup items from
+        them, instead of querying the full tables each run.
+    server_side
+        Default False. If True, load classroom items into a staging table
+        and compute existence flags and differences inside the database.
+        Only the differences are returned (see tables.analysis_stage).
+    processes
+        Default None (planned, otherwise single process). If > 1, partition
+        items by a hash of PRODUCTCODE_ID and analyse/compare partitions in
+        a process pool (see ecat.parallel). 1 = single process.
+    parallel_output
+        Default None (planned, otherwise False). If True, write the Excel
+        workbooks concurrently in worker processes while the analysis
+        continues (see xl.excel_scheduler).
+    incremental
+        Default False. If True, only analyse/compare items whose classroom
+        or eCAT data has changed since the last (incremental) run, results
+        of unchanged items are taken from a cache (see ecat.incremental).
+    plan
+        Default True. If True, plan processes, parallel output and fetch/
+        lookup sizes from the file size, rows, memory and CPUs (see
+        ecat.planner.execution_plan), explicit arguments override the plan.
+        An execution_plan can also be given. If False, use fixed defaults.
 
 
     Returns
@@ -161,76 +237,454 @@ def classroom_analyse(filename: Path, database: str='eCatalogDEV',
     None
 
     '''
-    connections = Connections()
-    con = connections.get_connection(database)
-    if con is None:
+    plan_ = _get_plan(filename, plan, processes=processes, parallel_output=parallel_output)
+    if plan_ is not None:
+        processes, parallel_output = plan_.processes, plan_.parallel_output
+
+    ctx = run_context(filename, database=database, last_update=last_update,
+                      connection=connection, plan=plan_)
+    if ctx.connection is None:
         return
 
-    logger.info('')
-    classroom_data = artikel(filename)
+    with excel_scheduler(processes=None if parallel_output else 0) as scheduler:
+        ctx.scheduler = scheduler
+        _analyse(ctx, snapshot=snapshot, server_side=server_side, processes=processes,
+                 incremental=incremental)
+
+
+def _get_plan(filename: Path, plan: Union[bool, execution_plan],
+        **overrides) -> Optional[execution_plan]:
+    ''' Return (logged) execution plan with explicit overrides, None if not planned
+
+    A given execution_plan is copied before the overrides are applied,
+    the caller's plan is left as it is (it may be reused for other runs).
+    '''
+
+    if plan is False:
+        return None
 
-    if last_update is None:
-        log_table = reimport_log(connection=con)
-        last_updated = log_table.get_last_update()
+    if plan is True:
+        plan = execution_plan(filename, **overrides)
     else:
-        last_updated = datetime.strptime(last_update, '%Y%m%d')
-        logger.info('')
-        logger.info('<< ::TEST:: RE-IMPORT DATE - MANUAL OVERRIDE >>')
+        plan = copy.copy(plan)
+        plan.override(**overrides)
+
+    plan.log()
+
+    return plan
+
+
+def _analyse(ctx: run_context, snapshot: bool=False, server_side: bool=False,
+        processes: Optional[int]=None, incremental: bool=False) -> Optional[pd.DataFrame]:
+    ''' classroom_analyse() steps 1-4, using (memoized) run context
+
+    Returns analysis dataframe, or None if the classroom data is invalid
+    or (server side) the staging table load failed.
+    '''
+    scheduler = ctx.scheduler
 
     logger.info('')
     logger.info('1. Import classroom data, filter')
-    df_classroom = (classroom_data.filter_data(filter_date=last_updated)
-                                  .sort_values('PRODUCTCODE_ID'))
+    df_classroom = ctx.df_classroom
 
-    if classroom_data.invalid_data():
-        return
+    if ctx.invalid:
+        return None
 
-    classroom_keys = classroom_data.get_keys()
+    if server_side:
+        return _analyse_server_side(ctx)
 
     logger.info('')
     logger.info('2. Using classroom item keys, get productcode, p_productcode')
-    product = product_code(keys=classroom_keys, published=False, connection=con)
-    df_product = product.get_dataframe(common_fields_only=True)
+    df_product = ctx.get_product_data(published=False, snapshot=snapshot)
+    df_p_product = ctx.get_product_data(published=True, snapshot=snapshot)
+
+    logger.info('')
+    if incremental:
+        logger.info('3/4. Analyse & compare changed classroom items with eCAT DB (incremental)')
+        cache = analysis_cache(database=ctx.database)
+        df_analysis, df_compare_product, df_compare_p_product = cache.compare(
+            df_classroom, df_product, df_p_product, processes=processes)
+    elif processes is not None and processes > 1:
+        logger.info('3/4. Analyse & compare classroom items with eCAT DB (parallel)')
+        df_analysis, df_compare_product, df_compare_p_product = parallel_compare(
+            df_classroom, df_product, df_p_product, processes=processes)
+    else:
+        # Same computation as the parallel / incremental modes (one partition),
+        # so that the results do not depend on the mode chosen.
+        logger.info('3/4. Analyse & compare classroom items with eCAT DB')
+        df_analysis, df_compare_product, df_compare_p_product = compare_frames(
+            df_classroom, df_product, df_p_product)
+
+    write_excel(df_analysis, filename='outputs/ECAT_Classroom_Item_Analysis.xlsx',
+                scheduler=scheduler, sidecar=True)
+    write_excel(df_compare_product, filename='outputs/ECAT_CSV_vs_PRODUCT.xlsx',
+                freeze_panes=(1,3), scheduler=scheduler, sidecar=True)
+    write_excel(df_compare_p_product, filename='outputs/ECAT_CSV_vs_P_PRODUCT.xlsx',
+                freeze_panes=(1,3), scheduler=scheduler, sidecar=True)
+
+    return df_analysis
+
+
+def _analyse_server_side(ctx: run_context) -> Optional[pd.DataFrame]:
+    ''' classroom_analyse() steps 2-4, executed set based inside the database
+
+    Returns analysis dataframe, or None if the staging table load failed.
+    '''
 
-    p_product = product_code(keys=classroom_keys, published=True, connection=con)
-    df_p_product = p_product.get_dataframe(common_fields_only=True)
+    scheduler = ctx.scheduler
+
+    logger.info('')
+    logger.info('2. Load classroom items into analysis staging table')
+    stage = analysis_stage(connection=ctx.connection)
+    if not stage.load(ctx.df_common_classroom):
+        logger.info('Staging table load failed, analysis aborted.')
+        return None
 
     logger.info('')
     logger.info('3. Analyse classroom items with eCAT DB product data')
-    df_analysis = generate_analysis(df_classroom, df_product, df_p_product)
+    df_classroom = ctx.df_classroom
+    df_flags = df_classroom[['PRODUCTCODE_ID']].merge(stage.get_flags(), how='left')
+    df_flags[['PRODUCT', 'P_PRODUCT']] = df_flags[['PRODUCT', 'P_PRODUCT']].fillna(False)
+    df_analysis = analysis_summary(df_classroom, df_flags, scheduler=scheduler)
 
     logger.info('')
     logger.info('4. Compare differences between common classroom & eCAT DB items')
-    df_common_classroom = classroom_data.get_dataframe(common_fields_only=True)
-    classroom_items = df_common_classroom['PRODUCTCODE_ID']
+    df_csv, df_product = stage.get_differences(published=False)
+    f ='outputs/ECAT_CSV_vs_PRODUCT.xlsx'
+    compare_data(df_csv, df_product, df_csv, table1='csv', table2='product', filename=f,
+                 scheduler=scheduler)
+
+    df_csv, df_p_product = stage.get_differences(published=True)
+    f ='outputs/ECAT_CSV_vs_P_PRODUCT.xlsx'
+    compare_data(df_csv, df_p_product, df_csv, table1='csv', table2='p_product', filename=f,
+                 scheduler=scheduler)
+
+    return df_analysis
+
+
+def classroom_run(filename: Path, database: str='eCatalogDEV',
+        last_update: Union[None, str]=None, update: bool=False,
+        render: bool=True, parallel_output: Optional[bool]=None,
+        connection: Optional[cx_Oracle.Connection]=None,
+        processes: Optional[int]=None, direct_path: bool=False,
+        plan: Union[bool, execution_plan]=True) -> bool:
+    ''' Analyse, render SQL's and upload classroom item data in one run.
+
+    Equivalent to running classroom_analyse(), render_sqls() and
+    classroom_upload() one after the other against the same file, except
+    that the CSV is parsed, filtered and validated once, the reimport log
+    is read once and a single database connection is used. Intermediate
+    results are memoized in a run context (see ecat.pipeline.run_context).
+
+
+    Parameters
+    ----------
+    filename
+        name of CSV extract file containing articles/item data from class.room
+    database
+        name of e-Catalogue database.
+        Valid values are: eCatalogDEV, eCatalogPRD
+    last_update
+        Default None. If None, use the last_update from reimport log table.
+        Can be specified to manually override reimport log table value or
+        used for testing.
+    update
+        Default False. If True, upload/merge CSV data with reimport table.
+        Update 'last updated' on reimport log table with filename date.
+    render
+        Default True. If True, render the update SQL's from the analysis.
+    parallel_output
+        Default None (planned, otherwise False). If True, write the Excel
+        workbooks concurrently in worker processes (see xl.excel_scheduler).
+    connection
+        Default None. If None, open a new connection to database.
+    processes
+        Default None (planned, otherwise single process). Analysis/compare
+        processes, see classroom_analyse().
+    direct_path
+        Default False. If True, direct-path bulk load, see classroom_upload().
+    plan
+        Default True. If True, plan processes, parallel output, read chunk
+        and fetch/lookup/upload sizes (see ecat.planner.execution_plan),
+        explicit arguments override the plan. An execution_plan can also
+        be given. If False, use fixed defaults.
+
+
+    Returns
+    -------
+    True if the run completed (uploaded, or nothing to upload), False if
+    the data is invalid or the upload did not complete.
+
+
+    Example
+    -------
+    from ecat.ecat import classroom_run
+
+    filename = Path('inputs') / 'export_artikel_20220204200253.csv'
+
+    classroom_run(filename=filename, database='eCatalogDEV', update=True)
+    '''
+    plan_ = _get_plan(filename, plan, processes=processes, parallel_output=parallel_output)
+    if plan_ is not None:
+        processes, parallel_output = plan_.processes, plan_.parallel_output
+
+    ctx = run_context(filename, database=database, last_update=last_update,
+                      connection=connection, plan=plan_)
+    if ctx.connection is None:
+        return False
+
+    with excel_scheduler(processes=None if parallel_output else 0) as scheduler:
+        ctx.scheduler = scheduler
+
+        logger.info('')
+        logger.info('<< ANALYSE >>')
+        df_analysis = _analyse(ctx, processes=processes)
+        if df_analysis is None:
+            return False
+
+        if render:
+            logger.info('')
+            logger.info('<< RENDER SQL >>')
+            _render_stage_sqls(df_analysis)
+
+        logger.info('')
+        logger.info('<< UPLOAD >>')
+        return _upload(ctx, update=update, direct_path=direct_path)
+
+
+def classroom_reconcile(filename: Path,
+        databases: Optional[List[str]]=None,
+        last_update: Union[None, str]=None,
+        connections_file: Optional[str]=None) -> Optional[pd.DataFrame]:
+    ''' Analyse classroom item data against several eCatalogue environments.
+
+    Fan-out alternative to running classroom_analyse() once per database
+    to check whether environments have drifted:
 
-    # Identify common rows between classroom and product table
-    keys = df_analysis['PRODUCTCODE_ID'].loc[df_analysis['PRODUCT']].tolist()
-    df_classroom_product = df_common_classroom[classroom_items.isin(keys)]
-    df_classroom_product = df_classroom_product.reset_index(drop=True)
+    - Connect to each environment (one connection per environment) and
+      read the reimport log concurrently.
 
-    # Identify common rows between classroom and p_product table
-    keys = df_analysis['PRODUCTCODE_ID'].loc[df_analysis['P_PRODUCT']].tolist()
-    df_classroom_p_product = df_common_classroom[classroom_items.isin(keys)]
-    df_classroom_p_product = df_classroom_p_product.reset_index(drop=True)
+    - Parse, filter & validate the classroom CSV once. Items are filtered
+      by the oldest last update of all environments.
+
+    - Fetch productcode and p_productcode data from each environment
+      concurrently (one thread per environment).
+
+    - Generate one analysis workbook with an extra ENVIRONMENT column,
+      i.e. one row per classroom item and environment.
+
+    - Generate a cross environment 'drift' workbook, comparing product and
+      p_product data of each environment with the first (baseline) one.
+
+
+    Parameters
+    ----------
+    filename
+        name of CSV extract file containing articles/item data from class.room
+    databases
+        connections.json entries (names) of e-Catalogue databases to compare.
+        Default None (['eCatalogDEV', 'eCatalogPRD']). The first one is the
+        baseline.
+    last_update
+        Default None. If None, use the oldest last_update from the reimport
+        log tables. Can be specified to manually override reimport log
+        table values or used for testing.
+    connections_file
+        Default None ('connections.json'). json formatted connections file.
+
+
+    Returns
+    -------
+    Combined analysis dataframe, or None if the classroom data is invalid.
+
+
+    Example
+    -------
+    from ecat.ecat import classroom_reconcile
+
+    filename = Path('inputs') / 'export_artikel_20220204200253.csv'
+
+    classroom_reconcile(filename=filename, databases=['eCatalogDEV', 'eCatalogPRD'])
+    '''
+    if databases is None:
+        databases = ['eCatalogDEV', 'eCatalogPRD']
+
+    if len(databases) < 2:
+        logger.info('Reconcile requires at least two databases.')
+        return None
+
+    connections = Connections(connections_file)
+
+    with ThreadPoolExecutor(max_workers=len(databases)) as executor:
+
+        logger.info('')
+        logger.info(f'1. Connect to {", ".join(databases)}')
+        con = dict(zip(databases, executor.map(connections.get_connection, databases)))
+
+        try:
+            if any(connection is None for connection in con.values()):
+                return None
+
+            ctx = run_context(filename, database=databases[0], last_update=last_update,
+                              connection=con[databases[0]])
+            if last_update is None:
+                get_last_update = lambda c: reimport_log(connection=c).get_last_update()
+                ctx.last_updated = min(executor.map(get_last_update, con.values()))
+
+            logger.info('')
+            logger.info('2. Import classroom data, filter (once)')
+            df_classroom = ctx.df_classroom
+            if ctx.invalid:
+                return None
+
+            logger.info('')
+            logger.info('3. Using classroom item keys, get productcode, p_productcode')
+            fetch = lambda c: _fetch_environment(c, ctx.classroom_keys)
+            products = dict(zip(databases, executor.map(fetch, con.values())))
+
+        finally:
+            for connection in con.values():
+                if connection is not None:
+                    connection.close()
 
     logger.info('')
-    f ='outputs/ECAT_CSV_vs_PRODUCT.xlsx'
-    df_compare = compare_data(df_classroom_product, df_product, df_classroom,
-                              table1='csv', table2='product', filename=f)
+    logger.info('4. Analyse classroom items with eCAT DB product data (per environment)')
+    results = []
+    for database, (df_product, df_p_product) in products.items():
+        df = generate_analysis(df_classroom, df_product, df_p_product, filename=None)
+        df.insert(0, 'ENVIRONMENT', database)
+        results.append(df)
 
-    f ='outputs/ECAT_CSV_vs_P_PRODUCT.xlsx'
-    df_compare = compare_data(df_classroom_p_product, df_p_product, df_classroom,
-                              table1='csv', table2='p_product', filename=f)
+    df_analysis = pd.concat(results, ignore_index=True)
+    write_excel(df_analysis, filename='outputs/ECAT_Classroom_Item_Analysis_by_Environment.xlsx',
+                freeze_panes=(1,2), sidecar=True)
+
+    logger.info('')
+    logger.info('5. Compare product data between environments')
+    df_drift = pd.concat([
+        compare_environments({db: products[db][0] for db in databases},
+                             table_name='PRODUCT', filename=None),
+        compare_environments({db: products[db][1] for db in databases},
+                             table_name='P_PRODUCT', filename=None)], ignore_index=True)
+    write_excel(df_drift, filename='outputs/ECAT_Environment_Drift.xlsx',
+                freeze_panes=(1,3), sidecar=True)
+
+    return df_analysis
+
+
+def _fetch_environment(connection: cx_Oracle.Connection,
+        keys: Union[str, List[str]]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    ''' productcode, p_productcode (common columns) data for keys, one environment '''
+
+    frames = []
+    for published in (False, True):
+        product = product_code(keys=keys, published=published, connection=connection,
+                               common_fields_only=True)
+        frames.append(product.get_dataframe(common_fields_only=True))
+
+    return frames[0], frames[1]
+
+
+def classroom_history(filename: Path, directory: str='history') -> Optional[pd.DataFrame]:
+    ''' Add classroom export to the local export history, diff with previous export.
+
+    Every class.room export is a full dump. Storing each export (one parquet
+    partition per export date) allows changes to be found export-to-export,
+    without a database round trip, and any earlier export to be revisited
+    (see ecat.history.export_history).
+
+
+    Parameters
+    ----------
+    filename
+        name of CSV extract file containing articles/item data from class.room
+    directory
+        Default 'history'. Directory containing export partitions.
+
+
+    Returns
+    -------
+    Differences dataframe, or None if there is no earlier export.
+
+
+    Example
+    -------
+    from ecat.ecat import classroom_history
+
+    filename = Path('inputs') / 'export_artikel_20220204200253.csv'
+
+    classroom_history(filename=filename)
+    '''
+    classroom_data = artikel(filename)
+
+    history = export_history(directory=directory)
+    history.add(classroom_data)
 
+    export_date = classroom_data.get_filename_date()
+    previous = [date for date in history.get_dates() if date < export_date]
+    if not previous:
+        logger.info(f'{filename}: no earlier export in {directory}')
+        return None
 
-def render_sqls(filename: str=None) -> None:
+    return history.diff(old=previous[-1], new=export_date)
+
+
+def classroom_watch(directory: str='inputs', database: str='eCatalogDEV',
+        interval: int=60, update: bool=False) -> None:
+    ''' Watch inputs directory, analyse & upload new classroom exports
+
+    Long running alternative to scheduling classroom_analyse() and
+    classroom_upload() from cron:
+
+    - Poll directory for new 'export_artikel_*.csv' files.
+
+    - Keep one database connection open (warm) between files.
+
+    - For each new file, once it has finished being written, run the
+      analysis and (if update=True) upload it to the reimport table.
+
+    - Record processed files in 'outputs/ECAT_processed_files.json'
+      so that a restart does not redo work.
+
+
+    Parameters
+    ----------
+    directory
+        Default 'inputs'. Directory to monitor for export files.
+    database
+        name of e-Catalogue database.
+        Valid values are: eCatalogDEV, eCatalogPRD
+    interval
+        Default 60. Seconds to wait between directory polls.
+    update
+        Default False. If True, upload/merge CSV data with reimport table.
+
+
+    Returns
+    -------
+    None
+
+
+    Example
+    -------
+    from ecat.ecat import classroom_watch
+
+    classroom_watch(directory='inputs', database='eCatalogDEV', update=True)
+    '''
+    w = watcher(directory=directory, database=database, interval=interval,
+                update=update)
+    w.run()
+
+
+def render_sqls(filename: Optional[str]=None) -> None:
     ''' Generate rendered SQL's to update eCatalogue DB
 
     Overview
     --------
 
-    - Read classroom/ecat analysis workbook.
+    - Read classroom/ecat analysis workbook (or its parquet sidecar,
+      if the workbook has not been edited since it was generated).
+      Only the columns needed are streamed from the workbook.
 
     - Read template/substitution values for each of the
       FOUR business rules (to update product/p_product) tables.
@@ -264,30 +718,53 @@ def render_sqls(filename: str=None) -> None:
     render_sqls(filename=f)
     '''
 
-    # Read classroom/ecat analysis summary Excel workbook
-    df = pd.read_excel(filename)
+    if filename is None:
+        logger.info('render_sqls: You MUST pass an analysis workbook')
+        return
 
-    # Make sure column name spaces replaced with underscores
-    df.columns = df.columns.str.replace(' ', '_')
+    # Prefer typed parquet sidecar written with the analysis workbook,
+    # fall back to the workbook itself if it has been hand-edited.
+    df = read_sidecar(filename)
+
+    if df is None:
+        # Stream only the columns the stage SQL's need from the
+        # classroom/ecat analysis summary Excel workbook
+        columns = ['PRODUCTCODE_ID', 'ARTICLE_STATUS', 'PRODUCT', 'P_PRODUCT']
+        df = read_excel_columns(filename, columns=columns,
+                                bool_cols=['PRODUCT', 'P_PRODUCT'])
+
+    _render_stage_sqls(df)
+
+
+def _render_stage_sqls(df: pd.DataFrame) -> None:
+    ''' Render the FOUR stage SQL's from analysis dataframe '''
 
     template_config = get_template_config()
 
+    s = STATUS()
+    status = df['ARTICLE_STATUS']
+    product = df['PRODUCT'].astype(bool)
+    p_product = df['P_PRODUCT'].astype(bool)
+    approved = status == s.get_code('Approved')
+
     stage1 = template_config['stage1']
-    result = df.query("ARTICLE_STATUS != 1000218 and PRODUCT")
+    result = df.loc[(status != s.get_code('NotThisCompany')) & product]
     stage1['articles'] = series_to_str(result['PRODUCTCODE_ID'])
     render_sql(template_sql='UPDATE.sql', template_values=stage1)
 
     stage2 = template_config['stage2']
-    result = df.query("ARTICLE_STATUS == 10260 and P_PRODUCT")
+    result = df.loc[approved & p_product]
     stage2['articles'] = series_to_str(result['PRODUCTCODE_ID'])
     render_sql(template_sql='UPDATE.sql', template_values=stage2)
 
     stage3 = template_config['stage3']
-    result = df.query("ARTICLE_STATUS == 10260 and not (P_PRODUCT)")
+    result = df.loc[approved & ~p_product]
     stage3['articles'] = series_to_str(result['PRODUCTCODE_ID'])
     render_sql(template_sql='INSERT.sql', template_values=stage3)
 
     stage4 = template_config['stage4']
-    result = df.query("ARTICLE_STATUS in (10257, 10262, 10263, 10264) and P_PRODUCT")
+    removed = [s.get_code(desc) for desc in ('NotForCatalog', 'Withdrawn',
+                                             'PendingProductLaunch', 'Obsolete')]
+    result = df.loc[status.isin(removed) & p_product]
     stage4['articles'] = series_to_str(result['PRODUCTCODE_ID'])
     render_sql(template_sql = 'DELETE.sql', template_values=stage4)
@@ -0,0 +1,194 @@
+import logging
+import cx_Oracle
+import numpy as np
+import pandas as pd
+from typing import Union, Optional, List, Iterator
+
+logger = logging.getLogger(__name__)
+
+# cx_Oracle column types mapped to numpy dtypes, anything else is 'object'
+_ORACLE_DTYPES = {cx_Oracle.DB_TYPE_NUMBER: 'float64',
+                  cx_Oracle.DB_TYPE_BINARY_DOUBLE: 'float64',
+                  cx_Oracle.DB_TYPE_BINARY_FLOAT: 'float64',
+                  cx_Oracle.DB_TYPE_BINARY_INTEGER: 'float64',
+                  cx_Oracle.DB_TYPE_DATE: 'datetime64[ns]',
+                  cx_Oracle.DB_TYPE_TIMESTAMP: 'datetime64[ns]'}
+
+# PostgreSQL type oids (psycopg2 cursor.description) mapped to numpy dtypes
+_POSTGRES_DTYPES = {20: 'float64', 21: 'float64', 23: 'float64',
+                    700: 'float64', 701: 'float64', 1700: 'float64',
+                    1082: 'datetime64[ns]', 1114: 'datetime64[ns]'}
+
+# Integer types (no decimal places) - converted to int64 if no nulls.
+_POSTGRES_INTEGERS = (20, 21, 23)
+
+
+def fetch_dataframe(connection: cx_Oracle.Connection, sql: str,
+                    params: Union[None, dict, list]=None,
+                    arraysize: int=5000) -> pd.DataFrame:
+    ''' Execute query and return results as a (typed) dataframe
+
+    Replacement for pd.read_sql(). Rows are fetched arraysize rows at a
+    time with cursor.fetchmany() straight into preallocated numpy arrays
+    typed from cursor.description, rather than materialising all rows as
+    python tuples first.
+
+    Parameters
+    ----------
+    connection
+        database connection object
+    sql
+        query text
+    params
+        Default None. Query bind variables.
+    arraysize
+        Default 5000. Number of rows fetched per database round trip.
+
+    Returns
+    -------
+    pandas dataframe
+
+    Example
+    -------
+    df = fetch_dataframe(con, 'select * from productcode', arraysize=10000)
+
+    '''
+    with connection.cursor() as cursor:
+        cursor.arraysize = arraysize
+        _execute(cursor, sql, params)
+
+        columns = [col[0] for col in cursor.description]
+        dtypes = _get_dtypes(cursor.description)
+
+        capacity = arraysize
+        arrays = [np.empty(capacity, dtype=dtype) for dtype in dtypes]
+        total_rows = 0
+
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                break
+
+            end = total_rows + len(rows)
+            if end > capacity:
+                capacity = max(capacity * 2, end)
+                arrays = [_grow(array, capacity, total_rows) for array in arrays]
+
+            for array, values in zip(arrays, zip(*rows)):
+                array[total_rows:end] = values
+
+            total_rows = end
+
+        arrays = [array[:total_rows] for array in arrays]
+
+    return _to_dataframe(columns, arrays, cursor.description)
+
+
+def fetch_chunks(connection: cx_Oracle.Connection, sql: str,
+                 params: Union[None, dict, list]=None,
+                 arraysize: int=5000) -> Iterator[pd.DataFrame]:
+    ''' Execute query, yielding results in (typed) dataframes of arraysize rows
+
+    Use for large table reads, memory is bounded by arraysize rows.
+
+    Parameters
+    ----------
+    connection
+        database connection object
+    sql
+        query text
+    params
+        Default None. Query bind variables.
+    arraysize
+        Default 5000. Number of rows fetched (and yielded) per round trip.
+
+    Returns
+    -------
+    Iterator of pandas dataframes
+
+    Example
+    -------
+    for df in fetch_chunks(con, 'select * from productcode'):
+        ...
+
+    '''
+    with connection.cursor() as cursor:
+        cursor.arraysize = arraysize
+        _execute(cursor, sql, params)
+
+        columns = [col[0] for col in cursor.description]
+        dtypes = _get_dtypes(cursor.description)
+
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                break
+
+            arrays = [np.empty(len(rows), dtype=dtype) for dtype in dtypes]
+            for array, values in zip(arrays, zip(*rows)):
+                array[:] = values
+
+            yield _to_dataframe(columns, arrays, cursor.description)
+
+
+def _execute(cursor, sql: str, params: Union[None, dict, list]=None) -> None:
+    ''' Execute statement with/without bind variables '''
+
+    if params is None:
+        cursor.execute(sql)
+    else:
+        cursor.execute(sql, params)
+
+
+def _get_dtypes(description: list) -> List[str]:
+    ''' Map cursor.description column types to numpy dtypes '''
+
+    dtypes = []
+    for _, type_code, _, _, precision, scale, _ in description:
+        if isinstance(type_code, int):
+            dtype = _POSTGRES_DTYPES.get(type_code, 'object')
+        else:
+            dtype = _ORACLE_DTYPES.get(type_code, 'object')
+
+        # Large integers would lose precision as float64
+        if dtype == 'float64' and scale == 0 and precision is not None and precision > 15:
+            dtype = 'object'
+
+        dtypes.append(dtype)
+
+    return dtypes
+
+
+def _is_integer(type_code, precision: Optional[int], scale: Optional[int]) -> bool:
+    ''' Is column type an integer (NUMBER(p, 0), smallint, integer, bigint) '''
+
+    if isinstance(type_code, int):
+        return type_code in _POSTGRES_INTEGERS
+
+    return (type_code == cx_Oracle.DB_TYPE_NUMBER and scale == 0
+            and precision is not None and 0 < precision <= 15)
+
+
+def _grow(array: np.ndarray, capacity: int, total_rows: int) -> np.ndarray:
+    ''' Return new array of given capacity, containing first total_rows values '''
+
+    new_array = np.empty(capacity, dtype=array.dtype)
+    new_array[:total_rows] = array[:total_rows]
+
+    return new_array
+
+
+def _to_dataframe(columns: List[str], arrays: List[np.ndarray],
+                  description: list) -> pd.DataFrame:
+    ''' Build dataframe from column arrays, integer columns without nulls -> int64 '''
+
+    data = {}
+    for column, array, col in zip(columns, arrays, description):
+        type_code, precision, scale = col[1], col[4], col[5]
+        if (array.dtype == 'float64' and _is_integer(type_code, precision, scale)
+                and not np.isnan(array).any()):
+            array = array.astype('int64')
+
+        data[column] = array
+
+    return pd.DataFrame(data, columns=columns, copy=False)
@@ -0,0 +1,196 @@
+import re
+import logging
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+from datetime import datetime
+from typing import Optional, List
+from ecat.classroom import artikel
+from ecat.analysis import normalize_types
+from ecat.sidecar import arrow_compatible
+from ecat.xl import write_excel
+from ecat.dates import parse_date
+
+logger = logging.getLogger(__name__)
+
+
+class export_history():
+    ''' Class to encapsulate a local history of (full) classroom exports
+
+    Each export is stored as its own parquet partition, keyed on the
+    export date from the filename (see artikel.get_filename_date):
+
+        history/export_date=20220204200253/part-0.parquet
+
+    Any two exports can then be compared on PRODUCTCODE_ID, without a
+    database round trip.
+
+    Example
+    -------
+    history = export_history(directory='history')
+    history.add(artikel(filename))
+    df_diff = history.diff()  # previous vs latest export
+
+    '''
+
+    def __init__(self, directory: str='history') -> None:
+        '''
+        Parameters
+        ----------
+        directory
+            Default 'history'. Directory containing export partitions.
+
+        Returns
+        -------
+        None
+
+        '''
+        self.directory = Path(directory)
+
+
+    def get_partition(self, export_date: datetime) -> Path:
+        ''' Return partition file name for export date '''
+
+        return self.directory / f'export_date={export_date:%Y%m%d%H%M%S}' / 'part-0.parquet'
+
+
+    def get_dates(self) -> List[datetime]:
+        ''' Return stored export dates (oldest first) '''
+
+        dates = []
+        for partition in self.directory.glob('export_date=*/part-0.parquet'):
+            match = re.search(r'export_date=(\d{14})', partition.as_posix())
+            if match:
+                dates.append(parse_date(match[1], source='filename'))
+
+        return sorted(dates)
+
+
+    def add(self, classroom_data: artikel, replace: bool=False) -> Path:
+        ''' Store classroom export as a new partition
+
+        Parameters
+        ----------
+        classroom_data
+            artikel (CSV) data, added before filtering i.e. the full export
+        replace
+            Default False. If True, overwrite an existing partition.
+
+        Returns
+        -------
+        partition file name
+        '''
+        export_date = classroom_data.get_filename_date()
+        filename = self.get_partition(export_date)
+
+        if filename.exists() and not replace:
+            logger.info(f'{filename}: export already in history.')
+            return filename
+
+        df = classroom_data.df
+        table = pa.Table.from_pandas(arrow_compatible(df), preserve_index=False)
+
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        pq.write_table(table, filename)
+
+        total_rows, total_cols = df.shape
+        logger.info(f'{filename}: {total_rows} rows, {total_cols} columns added to history.')
+
+        return filename
+
+
+    def load(self, export_date: datetime, columns: Optional[List[str]]=None) -> pd.DataFrame:
+        ''' Load export partition
+
+        Parameters
+        ----------
+        export_date
+            export date, see get_dates()
+        columns
+            Default None (all columns). Columns to read.
+
+        Returns
+        -------
+        pandas dataframe
+        '''
+        return pd.read_parquet(self.get_partition(export_date), columns=columns)
+
+
+    def diff(self, old: Optional[datetime]=None, new: Optional[datetime]=None,
+             filename: Optional[str]='outputs/ECAT_Export_Diff.xlsx') -> pd.DataFrame:
+        ''' Compare two exports on PRODUCTCODE_ID
+
+        Rows are first compared by (row) hash, only items whose hash differs
+        are compared column by column.
+
+        Parameters
+        ----------
+        old
+            Default None (previous export). Export date to compare from.
+        new
+            Default None (latest export). Export date to compare to.
+        filename
+            Excel output file name. If None, no workbook is written.
+
+        Returns
+        -------
+        dataframe with PRODUCTCODE_ID, CHANGE (ADDED, REMOVED, CHANGED)
+        and EXPORT_DATE columns followed by the added / removed rows, or
+        the differing columns of changed items (one row per export).
+        '''
+        dates = self.get_dates()
+        if new is None:
+            new = dates[-1]
+        if old is None:
+            old = max(date for date in dates if date < new)
+
+        df_old = self._prepare(self.load(old))
+        df_new = self._prepare(self.load(new))
+
+        results = []
+        for change, keys, df, export_date in (
+                ('ADDED', df_new.index.difference(df_old.index), df_new, new),
+                ('REMOVED', df_old.index.difference(df_new.index), df_old, old)):
+            df_change = df.loc[keys].reset_index()
+            df_change.insert(1, 'CHANGE', change)
+            df_change.insert(2, 'EXPORT_DATE', export_date)
+            results.append(df_change)
+
+        # Items in both exports, compare row hashes first
+        common = df_old.index.intersection(df_new.index)
+        columns = df_old.columns.intersection(df_new.columns)
+        df1, df2 = df_old.loc[common, columns], df_new.loc[common, columns]
+
+        changed = (pd.util.hash_pandas_object(df1, index=False).to_numpy() !=
+                   pd.util.hash_pandas_object(df2, index=False).to_numpy())
+        df1, df2 = normalize_types(df1[changed], df2[changed])
+
+        df_compare = df1.compare(df2, align_axis=0)
+        if not df_compare.empty:
+            df_compare = df_compare.reset_index().rename(columns={'level_1': 'EXPORT_DATE'})
+            df_compare.EXPORT_DATE = df_compare.EXPORT_DATE.replace({'self': old, 'other': new})
+            df_compare.insert(1, 'CHANGE', 'CHANGED')
+            results.append(df_compare)
+
+        df_diff = pd.concat(results, ignore_index=True)
+        df_diff = df_diff.sort_values('PRODUCTCODE_ID', kind='mergesort').reset_index(drop=True)
+
+        for change in ('ADDED', 'REMOVED', 'CHANGED'):
+            total = df_diff.loc[df_diff.CHANGE == change, 'PRODUCTCODE_ID'].nunique()
+            logger.info(f'Export {old:%Y%m%d%H%M%S} -> {new:%Y%m%d%H%M%S}: {total} items {change.lower()}')
+
+        if filename is not None:
+            write_excel(df_diff, filename=filename, freeze_panes=(1,3), sidecar=True)
+
+        return df_diff
+
+
+    def _prepare(self, df: pd.DataFrame) -> pd.DataFrame:
+        ''' Index export by PRODUCTCODE_ID, latest (DATE_LASTMODIFIED) row per item '''
+
+        df = df[df['PRODUCTCODE_ID'].notna()]
+        df = df.sort_values(['PRODUCTCODE_ID', 'DATE_LASTMODIFIED'], kind='mergesort')
+        df = df.drop_duplicates('PRODUCTCODE_ID', keep='last')
+
+        return df.set_index('PRODUCTCODE_ID')
@@ -0,0 +1,156 @@
+import logging
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+from typing import Optional, Tuple
+from ecat.parallel import parallel_compare, compare_frames, merge_results
+from ecat.sidecar import arrow_compatible
+
+logger = logging.getLogger(__name__)
+
+# Cached results, one parquet file each
+_RESULTS = ('analysis', 'csv_vs_product', 'csv_vs_p_product')
+
+
+class analysis_cache():
+    ''' Class to encapsulate (per item) cached analysis results
+
+    Analysis rows (flags, status) and difference rows are kept per
+    PRODUCTCODE_ID, together with row fingerprints (hashes) of the
+    classroom, product and p_product data they were computed from.
+    On the next run only items whose fingerprint on either side has
+    changed are analysed / compared again, the results of all other
+    items are taken from the cache.
+
+    Example
+    -------
+    cache = analysis_cache(database='eCatalogDEV')
+    df_analysis, df_compare_product, df_compare_p_product = cache.compare(
+        df_classroom, df_product, df_p_product)
+
+    '''
+
+    def __init__(self, database: str='eCatalogDEV',
+                 directory: str='outputs/ECAT_analysis_cache') -> None:
+        '''
+        Parameters
+        ----------
+        database
+            name of e-Catalogue database, results are cached per database.
+        directory
+            cache directory.
+
+        Returns
+        -------
+        None
+
+        '''
+        self.directory = Path(directory) / database
+
+
+    def get_fingerprints(self, df_classroom: pd.DataFrame, df_product: pd.DataFrame,
+                         df_p_product: pd.DataFrame) -> pd.DataFrame:
+        ''' Return CLASSROOM, PRODUCT, P_PRODUCT row fingerprints per classroom item
+
+        Items not found in product / p_product have a fingerprint of 0.
+        '''
+        fingerprints = pd.DataFrame({'CLASSROOM': _fingerprint(df_classroom)})
+        for name, df in (('PRODUCT', df_product), ('P_PRODUCT', df_p_product)):
+            fingerprints[name] = _fingerprint(df).reindex(fingerprints.index, fill_value=0)
+        fingerprints.index.name = 'PRODUCTCODE_ID'
+
+        return fingerprints
+
+
+    def compare(self, df_classroom: pd.DataFrame, df_product: pd.DataFrame,
+                df_p_product: pd.DataFrame,
+                processes: Optional[int]=None) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        ''' Incremental version of classroom_analyse() steps 3 & 4
+
+        Parameters
+        ----------
+        df_classroom
+            'classroom' item dataframe (converted from CSV)
+        df_product
+            product data(frame) from eCatalogue (common columns)
+        df_p_product
+            published product data(frame) from eCatalogue (common columns)
+        processes
+            Default None (single process). If > 1, changed items are
+            compared in a process pool (see ecat.parallel).
+
+        Returns
+        -------
+        Tuple of analysis, csv vs product and csv vs p_product dataframes.
+        No workbooks are written.
+        '''
+        fingerprints = self.get_fingerprints(df_classroom, df_product, df_p_product)
+        cached_fingerprints, cached = self.load()
+
+        common = fingerprints.index.intersection(cached_fingerprints.index)
+        same = (fingerprints.loc[common] == cached_fingerprints.loc[common]).all(axis=1)
+        reused = common[same.to_numpy()]
+        changed = fingerprints.index.difference(reused)
+
+        logger.info(f'Incremental analysis: {len(reused)} items reused, '
+                    f'{len(changed)} items analysed.')
+
+        subset = lambda df: df[df['PRODUCTCODE_ID'].isin(changed)].reset_index(drop=True)
+        if len(changed) == 0:
+            computed = [df.iloc[:0] for df in cached]
+        elif processes is not None and processes > 1:
+            computed = list(parallel_compare(subset(df_classroom), subset(df_product),
+                                             subset(df_p_product), processes=processes))
+        else:
+            computed = list(compare_frames(subset(df_classroom), subset(df_product),
+                                           subset(df_p_product)))
+
+        results = [merge_results([df, df_cached[df_cached['PRODUCTCODE_ID'].isin(reused)]])
+                   for df, df_cached in zip(computed, cached)]
+
+        # Keep cached results of items not in this run, replace all others
+        kept = cached_fingerprints.index.difference(fingerprints.index)
+        self._save(pd.concat([cached_fingerprints.loc[kept], fingerprints]),
+                   [merge_results([df, df_cached[df_cached['PRODUCTCODE_ID'].isin(kept)]])
+                    for df, df_cached in zip(results, cached)])
+
+        return results[0], results[1], results[2]
+
+
+    def load(self) -> Tuple[pd.DataFrame, list]:
+        ''' Load cached fingerprints and results (empty if no cache) '''
+
+        filename = self.directory / 'fingerprints.parquet'
+        if not filename.exists():
+            fingerprints = pd.DataFrame(columns=['CLASSROOM', 'PRODUCT', 'P_PRODUCT'],
+                                        dtype='int64')
+            fingerprints.index.name = 'PRODUCTCODE_ID'
+            empty = pd.DataFrame({'PRODUCTCODE_ID': pd.Series(dtype='int64')})
+            return fingerprints, [empty] * len(_RESULTS)
+
+        fingerprints = pd.read_parquet(filename).set_index('PRODUCTCODE_ID')
+        cached = [pd.read_parquet(self.directory / f'{name}.parquet') for name in _RESULTS]
+
+        return fingerprints, cached
+
+
+    def _save(self, fingerprints: pd.DataFrame, results: list) -> None:
+        ''' Save fingerprints and results '''
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        for name, df in zip(('fingerprints',) + _RESULTS,
+                            [fingerprints.reset_index()] + results):
+            table = pa.Table.from_pandas(arrow_compatible(df), preserve_index=False)
+            pq.write_table(table, self.directory / f'{name}.parquet')
+
+        logger.info(f'{self.directory}: {fingerprints.shape[0]} items cached.')
+
+
+def _fingerprint(df: pd.DataFrame) -> pd.Series:
+    ''' Row hash per PRODUCTCODE_ID (rows of the same item are combined) '''
+
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy().view('int64')
+
+    return pd.Series(hashes, index=df['PRODUCTCODE_ID'].to_numpy()).groupby(level=0).sum()
@@ -0,0 +1,157 @@
+import os
+import logging
+import tempfile
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+from pathlib import Path
+from typing import Optional, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from ecat.analysis import generate_analysis, compare_data
+from ecat.constants import COMMON_COLS
+
+logger = logging.getLogger(__name__)
+
+
+def partition(df: pd.DataFrame, partitions: int) -> List[pd.DataFrame]:
+    ''' Split dataframe into partitions by a hash of PRODUCTCODE_ID
+
+    The same PRODUCTCODE_ID always lands in the same partition, so that
+    classroom, product and p_product partitions can be compared on their own.
+
+    Parameters
+    ----------
+    df
+        pandas dataframe containing PRODUCTCODE_ID column
+    partitions
+        number of partitions
+
+    Returns
+    -------
+    list of dataframes (index reset), one per partition
+    '''
+    keys = df['PRODUCTCODE_ID'].astype('int64').to_numpy()
+    buckets = pd.util.hash_array(keys) % np.uint64(partitions)
+
+    return [df[buckets == i].reset_index(drop=True) for i in range(partitions)]
+
+
+def parallel_compare(df_classroom: pd.DataFrame, df_product: pd.DataFrame,
+                     df_p_product: pd.DataFrame,
+                     processes: Optional[int]=None) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    ''' Partitioned, multiprocess version of classroom_analyse() steps 3 & 4
+
+    Classroom, product and p_product data are partitioned by a hash of
+    PRODUCTCODE_ID. Partitions are written as uncompressed (Arrow) feather
+    files that worker processes memory map, rather than pickling dataframes
+    to them.
+    Each partition is analysed / compared in a process pool, the partial
+    results are then merged.
+
+    Parameters
+    ----------
+    df_classroom
+        'classroom' item dataframe (converted from CSV)
+    df_product
+        product data(frame) from eCatalogue (common columns)
+    df_p_product
+        published product data(frame) from eCatalogue (common columns)
+    processes
+        Default None (os.cpu_count()). Number of worker processes/partitions.
+
+    Returns
+    -------
+    Tuple of analysis, csv vs product and csv vs p_product dataframes.
+    No workbooks are written.
+
+    NOTE: On Windows, scripts using this must be guarded with
+    if __name__ == '__main__': (worker processes re-import the script)
+    '''
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    logger.info(f'Parallel compare: {processes} partitions/processes')
+
+    with tempfile.TemporaryDirectory(prefix='ecat_') as directory:
+
+        for name, df in (('classroom', df_classroom), ('product', df_product),
+                         ('p_product', df_p_product)):
+            for i, df_partition in enumerate(partition(df, processes)):
+                # Uncompressed, so that workers can memory map the file
+                df_partition.to_feather(Path(directory) / f'{name}_{i}.feather',
+                                        compression='uncompressed')
+
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(_compare_partition, directory, i)
+                       for i in range(processes)]
+            results = [future.result() for future in futures]
+
+    df_analysis = merge_results([result[0] for result in results])
+    df_compare_product = merge_results([result[1] for result in results])
+    df_compare_p_product = merge_results([result[2] for result in results])
+
+    logger.info(f'Parallel compare: {df_analysis.shape[0]} items analysed')
+
+    return df_analysis, df_compare_product, df_compare_p_product
+
+
+def _compare_partition(directory: str, i: int) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    ''' Analyse / compare a single partition (runs in worker process) '''
+
+    read = lambda name: feather.read_table(Path(directory) / f'{name}_{i}.feather',
+                                           memory_map=True).to_pandas()
+
+    return compare_frames(read('classroom'), read('product'), read('p_product'))
+
+
+def compare_frames(df_classroom: pd.DataFrame, df_product: pd.DataFrame,
+                   df_p_product: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    ''' Analyse / compare classroom items with product & p_product data (no workbooks)
+
+    Frames must be sorted by PRODUCTCODE_ID, with a default (range) index.
+
+    Returns
+    -------
+    Tuple of analysis, csv vs product and csv vs p_product dataframes.
+    '''
+    df_analysis = generate_analysis(df_classroom, df_product, df_p_product, filename=None)
+
+    df_common_classroom = df_classroom[COMMON_COLS().get()]
+    classroom_items = df_common_classroom['PRODUCTCODE_ID']
+
+    compared = []
+    for flag, df, table2 in (('PRODUCT', df_product, 'product'),
+                             ('P_PRODUCT', df_p_product, 'p_product')):
+        keys = df_analysis['PRODUCTCODE_ID'].loc[df_analysis[flag].astype(bool)].tolist()
+        df_common = df_common_classroom[classroom_items.isin(keys)].reset_index(drop=True)
+        compared.append(compare_data(df_common, df, df_common, table1='csv',
+                                     table2=table2, filename=None))
+
+    return df_analysis, compared[0], compared[1]
+
+
+def merge_results(results: List[pd.DataFrame]) -> pd.DataFrame:
+    ''' Concatenate partial (e.g. partition) results, ordered by PRODUCTCODE_ID
+
+    Parameters
+    ----------
+    results
+        list of analysis or compare dataframes, the first defines the
+        column order. The sort is stable, rows of the same item keep
+        their order.
+
+    Returns
+    -------
+    dataframe (index reset)
+    '''
+
+    df = pd.concat(results)
+
+    # Columns in the same order as the first partial result
+    # plus any extra (compared) columns found in other partitions.
+    columns = list(results[0].columns)
+    columns += [col for col in df.columns if col not in columns]
+
+    df = df[columns].sort_values('PRODUCTCODE_ID', kind='mergesort')
+
+    return df.reset_index(drop=True)
@@ -0,0 +1,186 @@
+import logging
+import cx_Oracle
+import pandas as pd
+from pathlib import Path
+from datetime import datetime
+from functools import cached_property
+from typing import Union, Optional, Dict, List
+from ecat.db import Connections
+from ecat.tables import reimport_log, reimport, product_code
+from ecat.snapshot import product_snapshot
+from ecat.classroom import artikel
+from ecat.xl import excel_scheduler
+from ecat.dates import parse_date
+from ecat.planner import execution_plan
+
+logger = logging.getLogger(__name__)
+
+
+class run_context():
+    ''' Class to encapsulate a single classroom -> eCatalogue run
+
+    Holds one database connection and memoizes each expensive step (CSV
+    parse, reimport log lookup, filter/validation, product lookups) so that
+    analysis, SQL rendering and upload share the same parsed, filtered and
+    validated dataset. Each step runs at most once, on first use.
+
+    Example
+    -------
+    ctx = run_context(filename, database='eCatalogDEV')
+    df = ctx.df_classroom
+    if not ctx.invalid:
+        df_product = ctx.get_product_data(published=False)
+
+    '''
+
+    def __init__(self, filename: Path, database: str='eCatalogDEV',
+                 last_update: Union[None, str]=None,
+                 connection: Optional[cx_Oracle.Connection]=None,
+                 scheduler: Optional[excel_scheduler]=None,
+                 plan: Optional[execution_plan]=None) -> None:
+        '''
+        Parameters
+        ----------
+        filename
+            name of CSV extract file containing articles/item data from class.room
+        database
+            name of e-Catalogue database.
+            Valid values are: eCatalogDEV, eCatalogPRD
+        last_update
+            Default None. If None, use the last_update from reimport log table.
+            Can be specified ('%Y%m%d') to manually override reimport log
+            table value or used for testing.
+        connection
+            Default None. If None, open a new connection to database.
+        scheduler
+            Default None. excel_scheduler used for (error) workbooks.
+        plan
+            Default None (default fetch/batch sizes). execution_plan.
+
+        Returns
+        -------
+        None
+
+        '''
+        self.filename = filename
+        self.database = database
+        self.last_update = last_update
+        self.scheduler = scheduler
+        self.plan = plan
+        self._connection = connection
+        self._products: Dict[bool, pd.DataFrame] = {}
+
+
+    @cached_property
+    def connection(self) -> Optional[cx_Oracle.Connection]:
+        ''' Database connection (opened once) '''
+
+        if self._connection is not None:
+            return self._connection
+
+        connections = Connections()
+        return connections.get_connection(self.database)
+
+
+    @cached_property
+    def reimport_table(self) -> reimport:
+        ''' Reimport table (and its cached table catalog) '''
+
+        return reimport(connection=self.connection)
+
+
+    @cached_property
+    def last_updated(self) -> datetime:
+        ''' Last reimport date, from reimport log table or manual override '''
+
+        if self.last_update is None:
+            log_table = reimport_log(connection=self.connection)
+            return log_table.get_last_update()
+
+        logger.info('')
+        logger.info('<< ::TEST:: RE-IMPORT DATE - MANUAL OVERRIDE >>')
+
+        return parse_date(self.last_update, source='override')
+
+
+    @cached_property
+    def classroom_data(self) -> artikel:
+        ''' Parsed classroom CSV data '''
+
+        dtype = self.reimport_table.catalog.get_dtypes(self.reimport_table.table)
+
+        if self.plan is None or not self.plan.chunk_size:
+            return artikel(self.filename, dtype=dtype)
+
+        # Too large for memory: only keep rows that pass the filter
+        return artikel(self.filename, dtype=dtype, chunk_size=self.plan.chunk_size,
+                       filter_date=self.last_updated)
+
+
+    @cached_property
+    def df_classroom(self) -> pd.DataFrame:
+        ''' Classroom data filtered by last update (sorted by PRODUCTCODE_ID) '''
+
+        return self.classroom_data.filter_data(filter_date=self.last_updated)
+
+
+    @cached_property
+    def invalid(self) -> bool:
+        ''' Does the filtered classroom data contain invalid PRODUCTCODE_IDs '''
+
+        self.df_classroom  # filter before validating
+        return self.classroom_data.invalid_data(scheduler=self.scheduler)
+
+
+    @cached_property
+    def df_common_classroom(self) -> pd.DataFrame:
+        ''' Filtered classroom data, columns common with product tables only '''
+
+        self.invalid  # validate (PRODUCTCODE_ID -> numeric) first
+        return self.classroom_data.get_dataframe(common_fields_only=True)
+
+
+    @cached_property
+    def classroom_keys(self) -> Union[str, List[str]]:
+        ''' Filtered classroom item keys (productcode_id||baxter_productcode) '''
+
+        self.invalid  # validate (PRODUCTCODE_ID -> numeric) first
+        return self.classroom_data.get_keys()
+
+
+    def get_product_data(self, published: bool=False,
+                         snapshot: bool=False) -> pd.DataFrame:
+        ''' productcode / p_productcode (common columns) data for classroom keys
+
+        Parameters
+        ----------
+        published
+            Default False. Retrieve product_code table data
+            If True, retrieve p_productcode table data
+        snapshot
+            Default False. If True, refresh local snapshot and lookup from it.
+
+        Returns
+        -------
+        pandas dataframe
+        '''
+        if published not in self._products:
+            product_snapshot_ = None
+            if snapshot:
+                product_snapshot_ = product_snapshot(connection=self.connection,
+                                                     database=self.database,
+                                                     published=published)
+                product_snapshot_.refresh()
+
+            arraysize, batch_size = 1000, 1000
+            if self.plan is not None:
+                arraysize, batch_size = self.plan.fetch_size, self.plan.lookup_batch_size
+
+            product = product_code(keys=self.classroom_keys, published=published,
+                                   connection=self.connection,
+                                   snapshot=product_snapshot_,
+                                   common_fields_only=True,
+                                   arraysize=arraysize, batch_size=batch_size)
+            self._products[published] = product.get_dataframe(common_fields_only=True)
+
+        return self._products[published]
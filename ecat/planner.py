@@ -0,0 +1,164 @@
+import os
+import logging
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Assumed available memory, if it cannot be determined (e.g. on Windows)
+_DEFAULT_MEMORY = 4 * 1024**3
+
+# Approximate in-memory (dataframe) size / CSV file size
+_MEMORY_FACTOR = 5
+
+# Row count thresholds
+_SMALL_ROWS = 10000
+_PARALLEL_OUTPUT_ROWS = 20000
+_PROCESS_POOL_ROWS = 100000
+
+# Chunked read: minimum rows per chunk, share of the memory one chunk may use
+_MIN_CHUNK_ROWS = 10000
+_CHUNK_MEMORY_SHARE = 10
+
+
+def get_available_memory(meminfo: str='/proc/meminfo') -> Optional[int]:
+    ''' Return available physical memory (bytes), None if unknown
+
+    Linux MemAvailable, i.e. free memory plus reclaimable page cache
+    (sysconf SC_AVPHYS_PAGES is free memory only).
+    '''
+    try:
+        with open(meminfo) as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+
+    return None
+
+
+def estimate_rows(filename: Path, sample_size: int=1024 * 1024) -> int:
+    ''' Estimate CSV data rows from file size and (first block) average row length '''
+
+    file_size = Path(filename).stat().st_size
+
+    with open(filename, 'rb') as f:
+        sample = f.read(sample_size)
+
+    lines = sample.count(b'\n')
+    if len(sample) >= file_size or lines == 0:
+        return max(lines - 1, 0)
+
+    return max(int(file_size / (len(sample) / lines)) - 1, 0)
+
+
+class execution_plan():
+    ''' Class to encapsulate how a classroom run is executed
+
+    Based on the export file size, (estimated) rows, available memory and
+    CPU count, choose the database fetch size, key lookup & upload batch
+    sizes and whether to use process pools. Small runs keep the simple,
+    low latency (in-process) path, large runs are spread over processes
+    provided that they fit in memory. Files that do not fit in memory
+    at all are read in chunks, filtered while reading (chunk_size).
+
+    Any setting can be overridden explicitly.
+
+    Example
+    -------
+    plan = execution_plan(filename, processes=1)  # override: no process pool
+    plan.log()
+    classroom_analyse(filename, plan=plan)
+
+    '''
+
+    def __init__(self, filename: Path, **overrides) -> None:
+        '''
+        Parameters
+        ----------
+        filename
+            name of CSV extract file containing articles/item data from class.room
+        overrides
+            explicit settings (None values are ignored): processes,
+            parallel_output, fetch_size, lookup_batch_size, upload_batch_size,
+            chunk_size
+
+        Returns
+        -------
+        None
+
+        '''
+        self.filename = filename
+        self.file_size = Path(filename).stat().st_size
+        self.rows = estimate_rows(filename)
+        self.memory = get_available_memory()
+        self.cpus = os.cpu_count() or 1
+
+        memory = self.memory if self.memory is not None else _DEFAULT_MEMORY
+        self.memory_needed = self.file_size * _MEMORY_FACTOR
+
+        # Process pools (roughly) double the memory needed, partitions are
+        # copied to the worker processes.
+        fits_twice = self.memory_needed * 2 < memory
+
+        if self.rows >= _PROCESS_POOL_ROWS and self.cpus > 1 and fits_twice:
+            self.processes: Optional[int] = min(self.cpus, 8)
+        else:
+            self.processes = None
+
+        self.parallel_output = self.rows >= _PARALLEL_OUTPUT_ROWS and self.cpus > 1
+
+        # Rows per database round trip
+        self.fetch_size = 1000 if self.rows < _SMALL_ROWS else 5000
+
+        # Keys per product lookup query (Oracle 'in' list maximum is 1000)
+        self.lookup_batch_size = 1000
+
+        # Rows per upload batch/commit: one batch for small runs, larger
+        # batches (fewer commits) when memory allows.
+        self.upload_batch_size = max(1000, min(self.rows, 50000 if fits_twice else 10000))
+
+        # CSV rows per read chunk, None (or 0): read the whole file at once
+        self.fits = self.memory_needed <= memory
+        self.chunk_size: Optional[int] = None
+        if not self.fits:
+            rows_in_memory = self.rows * memory // self.memory_needed
+            self.chunk_size = max(_MIN_CHUNK_ROWS, rows_in_memory // _CHUNK_MEMORY_SHARE)
+
+        self.override(**overrides)
+
+
+    def override(self, **overrides) -> None:
+        ''' Set explicit settings (None values are ignored) '''
+
+        for name, value in overrides.items():
+            if name not in ('processes', 'parallel_output', 'fetch_size',
+                            'lookup_batch_size', 'upload_batch_size', 'chunk_size'):
+                raise ValueError(f'Invalid execution plan setting: {name}')
+
+            if value is not None:
+                setattr(self, name, value)
+
+
+    def log(self) -> None:
+        ''' Log the chosen plan '''
+
+        memory = 'unknown' if self.memory is None else f'{self.memory / 1024**2:.0f} MB'
+
+        logger.info('')
+        logger.info(f'<< EXECUTION PLAN: {Path(self.filename).name} >>')
+        logger.info(f'File size {self.file_size / 1024**2:.1f} MB, ~{self.rows} rows, '
+                    f'memory available {memory}, {self.cpus} CPUs')
+        logger.info(f'Processes: {self.processes or 1}, parallel output: {self.parallel_output}')
+        logger.info(f'Fetch size: {self.fetch_size}, lookup batch: {self.lookup_batch_size}, '
+                    f'upload batch: {self.upload_batch_size}')
+
+        if self.fits:
+            return
+
+        needed = f'Needs ~{self.memory_needed / 1024**2:.0f} MB, more than available'
+        if self.chunk_size:
+            logger.warning(f'{needed}: reading in chunks of {self.chunk_size} rows')
+        else:
+            logger.warning(f'{needed}: not reading in chunks, the run may run out of memory')
@@ -0,0 +1,106 @@
+import json
+import logging
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+from datetime import datetime
+from typing import Union, Optional
+from ecat.version import __version__
+
+logger = logging.getLogger(__name__)
+
+
+def write_sidecar(df: pd.DataFrame, filename: Union[str, Path],
+                  workbook: Union[None, str, Path]=None) -> None:
+    ''' Write typed parquet 'sidecar' of an output workbook
+
+    Column names are kept as is (underscores) and ecat schema metadata
+    (version, created, workbook, column dtypes) is stored in the file.
+
+    Parameters
+    ----------
+    df
+        Pandas DataFrame
+    filename
+        parquet output file name
+    workbook
+        Default None. Name of the Excel workbook the sidecar belongs to.
+
+    Returns
+    -------
+    None
+    '''
+    table = pa.Table.from_pandas(arrow_compatible(df), preserve_index=False)
+
+    ecat_metadata = {'version': __version__,
+                     'created': "{:%Y-%m-%d %H:%M:%S}".format(datetime.now()),
+                     'workbook': None if workbook is None else Path(workbook).name,
+                     'dtypes': {col: str(dtype) for col, dtype in df.dtypes.items()}}
+    metadata = dict(table.schema.metadata or {})
+    metadata[b'ecat'] = json.dumps(ecat_metadata).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    pq.write_table(table, filename)
+
+    logger.info(f'{filename} created.')
+
+
+def read_sidecar(workbook: Union[str, Path]) -> Optional[pd.DataFrame]:
+    ''' Read typed parquet 'sidecar' for given output workbook
+
+    Returns None if there is no sidecar, or the workbook has been modified
+    after the sidecar was written (i.e. hand-edited), in which case the
+    workbook itself should be read.
+
+    Parameters
+    ----------
+    workbook
+        Excel workbook name
+
+    Returns
+    -------
+    pandas dataframe or None
+    '''
+    workbook = Path(workbook)
+    filename = workbook.with_suffix('.parquet')
+
+    if not filename.exists():
+        return None
+
+    if workbook.exists() and workbook.stat().st_mtime > filename.stat().st_mtime:
+        logger.info(f'{workbook}: modified after {filename.name}, sidecar ignored.')
+        return None
+
+    df = pd.read_parquet(filename)
+    logger.info(f'{filename}: {df.shape[0]} rows, {df.shape[1]} columns.')
+
+    return df
+
+
+def arrow_compatible(df: pd.DataFrame) -> pd.DataFrame:
+    ''' Convert (object) columns holding mixed types to string
+
+    pyarrow cannot convert object columns holding e.g. both numbers and
+    strings. Use before pa.Table.from_pandas() of any ecat dataframe.
+
+    Parameters
+    ----------
+    df
+        Pandas DataFrame
+
+    Returns
+    -------
+    dataframe (a copy, if any column was converted)
+    '''
+
+    mixed_cols = [col for col in df.select_dtypes('object').columns
+                  if pd.api.types.infer_dtype(df[col], skipna=True) in ('mixed', 'mixed-integer')]
+    if not mixed_cols:
+        return df
+
+    df = df.copy()
+    for col in mixed_cols:
+        df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+
+    return df
@@ -0,0 +1,212 @@
+import re
+import json
+import logging
+import cx_Oracle
+import pandas as pd
+from pathlib import Path
+from datetime import datetime
+from ecat.fetch import fetch_dataframe
+from ecat.sidecar import arrow_compatible
+from ecat.constants import COMMON_COLS
+from typing import Union, Optional, List
+
+logger = logging.getLogger(__name__)
+
+
+class product_snapshot():
+    ''' Class to encapsulate a local (parquet) snapshot of productcode / p_productcode
+
+    The snapshot is synchronised using a DATE_LASTMODIFIED 'watermark'.
+    Only rows modified on/after the stored watermark are fetched from the
+    database and merged into the local copy. Snapshots (and watermarks)
+    are kept per database.
+
+    Only the columns common with the classroom data are kept, LOB values
+    are read into strings.
+
+    NOTE: Rows deleted from the database are not detected by an incremental
+    refresh. Use refresh(full=True) to rebuild the snapshot from scratch.
+
+    Example
+    -------
+    snapshot = product_snapshot(connection=con, database='eCatalogDEV', published=False)
+    snapshot.refresh()
+    df = snapshot.lookup(keys=classroom_data.get_keys(as_list=True))
+
+    '''
+
+    def __init__(self, connection: cx_Oracle.Connection, database: str,
+                 published: bool=False, directory: str='snapshots') -> None:
+        '''
+        Parameters
+        ----------
+        connection
+            database connection object
+        database
+            name of e-Catalogue database (connection), snapshots are kept
+            per database.
+        published
+            Default False. Snapshot productcode table data
+            If True, snapshot p_productcode table data
+        directory
+            Default 'snapshots'. Directory containing snapshot files, one
+            sub directory per database.
+
+        Returns
+        -------
+        None
+
+        '''
+        if published:
+            self.table = 'p_productcode'
+        else:
+            self.table = 'productcode'
+
+        self.connection = connection
+        self.directory = Path(directory) / database
+        self.columns = COMMON_COLS().get()
+        self.filename = self.directory / f'{self.table}.parquet'
+        self.watermark_file = self.directory / f'{self.table}.json'
+        self.df: Optional[pd.DataFrame] = None
+
+
+    def get_watermark(self) -> Optional[datetime]:
+        ''' Return stored DATE_LASTMODIFIED watermark (None if no snapshot) '''
+
+        if not (self.filename.exists() and self.watermark_file.exists()):
+            return None
+
+        with open(self.watermark_file) as f:
+            watermark = json.load(f)['watermark']
+
+        if watermark is None:
+            return None
+
+        return datetime.fromisoformat(watermark)
+
+
+    def load(self) -> pd.DataFrame:
+        ''' Load snapshot from disk (empty dataframe if no snapshot) '''
+
+        if self.df is None:
+            if self.filename.exists():
+                self.df = pd.read_parquet(self.filename)
+            else:
+                self.df = pd.DataFrame()
+
+        return self.df
+
+
+    def refresh(self, full: bool=False) -> pd.DataFrame:
+        ''' Fetch rows modified since watermark and merge into snapshot
+
+        Parameters
+        ----------
+        full
+            Default False. If True, ignore watermark and re-pull whole table.
+
+        Returns
+        -------
+        Snapshot pandas dataframe
+        '''
+        watermark = None if full else self.get_watermark()
+        select_list = ', '.join(self.columns)
+
+        if watermark is None:
+            sql = f'select {select_list} from {self.table}'
+            df_changed = self._read_lobs(fetch_dataframe(self.connection, sql))
+            df = df_changed
+        else:
+            # '>=' rather than '>' - rows sharing the watermark timestamp
+            # but committed later are then not missed (merge de-duplicates).
+            sql = f'select {select_list} from {self.table} where date_lastmodified >= :watermark'
+            df_changed = self._read_lobs(fetch_dataframe(self.connection, sql,
+                                                         params={'watermark': watermark}))
+            df = self._merge(self.load(), df_changed)
+
+        df = df.sort_values('PRODUCTCODE_ID').reset_index(drop=True)
+        self._save(df)
+
+        total_rows, total_cols = df.shape
+        logger.info(f'{self.table}: snapshot refreshed, {df_changed.shape[0]} changed rows.')
+        logger.info(f'{self.table}: snapshot {total_rows} rows, {total_cols} columns.')
+
+        return df
+
+
+    def lookup(self, keys: Union[str, List[str]],
+               columns: Optional[List[str]]=None) -> pd.DataFrame:
+        ''' Return snapshot rows matching productcode_id||baxter_productcode keys
+
+        Parameters
+        ----------
+        keys
+            list of keys or SQL 'in' list string, see artikel.get_keys()
+        columns
+            Default None (all columns). Columns to return, also when the
+            snapshot is empty.
+
+        Returns
+        -------
+        pandas dataframe
+        '''
+        if isinstance(keys, str):
+            keys = re.findall(r"'([^']*)'", keys)
+
+        df = self.load()
+        if df.empty:
+            return pd.DataFrame(columns=columns if columns is not None else df.columns)
+
+        # Integer ids, a float64 column (e.g. nulls in the parquet) gives '123.0'
+        product_ids = df.PRODUCTCODE_ID.astype('Int64').astype(str)
+        df = df[(product_ids + df.BAXTER_PRODUCTCODE.astype(str)).isin(keys)]
+        if columns is not None:
+            df = df[columns]
+
+        return df.reset_index(drop=True)
+
+
+    def _merge(self, df: pd.DataFrame, df_changed: pd.DataFrame) -> pd.DataFrame:
+        ''' Replace existing snapshot rows with changed rows (by key) '''
+
+        if df.empty:
+            return df_changed
+
+        if df_changed.empty:
+            return df
+
+        key_cols = ['PRODUCTCODE_ID', 'BAXTER_PRODUCTCODE']
+        existing_keys = pd.MultiIndex.from_frame(df[key_cols])
+        changed_keys = pd.MultiIndex.from_frame(df_changed[key_cols])
+
+        df = df[~existing_keys.isin(changed_keys)]
+
+        return pd.concat([df, df_changed], ignore_index=True)
+
+
+    def _read_lobs(self, df: pd.DataFrame) -> pd.DataFrame:
+        ''' Read (CLOB) LOB values, parquet cannot store LOB objects '''
+
+        for col in df.select_dtypes('object').columns:
+            if df[col].map(lambda x: isinstance(x, cx_Oracle.LOB)).any():
+                df[col] = df[col].map(lambda x: x.read() if isinstance(x, cx_Oracle.LOB) else x)
+
+        return df
+
+
+    def _save(self, df: pd.DataFrame) -> None:
+        ''' Save snapshot and DATE_LASTMODIFIED watermark '''
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        arrow_compatible(df).to_parquet(self.filename, index=False)
+
+        watermark = df['DATE_LASTMODIFIED'].max() if not df.empty else None
+        if pd.isna(watermark):
+            watermark = None
+        else:
+            watermark = pd.Timestamp(watermark).isoformat()
+
+        with open(self.watermark_file, 'w') as f:
+            json.dump({'watermark': watermark}, f)
+
+        self.df = df
@@ -1,10 +1,20 @@
 from datetime import datetime
-from ecat.constants import COMMON_COLS
+from ecat.constants import COMMON_COLS, CATEGORICAL_COLS
+from ecat.snapshot import product_snapshot
+from ecat.fetch import fetch_dataframe
+from ecat.catalog import table_catalog
+from ecat.xl import get_filename
+from ecat.dates import to_db_dates
+import io
+import re
+import json
 import cx_Oracle
+import psycopg2
 import logging
 import numpy as np
 import pandas as pd
-from typing import Union, Optional, List
+from pathlib import Path
+from typing import Union, Optional, List, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -16,8 +26,13 @@ logging.basicConfig(level=logging.INFO, format=format, datefmt=datefmt)
 class product_code():
     ''' Class to encapsulate the productcode and p_productcode tables in ecat database '''
 
-    def __init__(self, connection: cx_Oracle.Connection, keys: str,
-                 published: bool=False, ) -> None:
+    def __init__(self, connection: cx_Oracle.Connection, keys: Union[str, List[str]],
+                 published: bool=False,
+                 snapshot: Optional[product_snapshot]=None,
+                 common_fields_only: bool=False,
+                 columns: Optional[List[str]]=None,
+                 lazy_columns: Optional[List[str]]=None,
+                 arraysize: int=1000, batch_size: int=1000) -> None:
         ''' product_code / p_productcode constructor
 
         Parameters
@@ -25,10 +40,27 @@ class product_code():
         connection
             database connection object
         keys
-            A list of keys ()
+            A list of keys (productcode_id||baxter_productcode), either as a
+            list or SQL 'in' list string, see artikel.get_keys()
         published
             Default False. Retrieve product_code table data
             If True, retrieve p_productcode table data
+        snapshot
+            Default None. If given, answer key lookups from the local
+            (refreshed) product_snapshot instead of querying the database.
+        common_fields_only
+            Default False. If True, only select COMMON_COLS columns.
+        columns
+            Default None (all columns). Columns to select, overrides
+            common_fields_only.
+        lazy_columns
+            Default None. (LOB heavy) columns excluded from the initial
+            select and only fetched when get_dataframe() needs them.
+        arraysize
+            Default 1000. Number of rows fetched per database round trip.
+        batch_size
+            Default 1000 (Oracle maximum 'in' list size). Number of keys
+            looked up per query.
 
         Returns
         -------
@@ -40,19 +72,47 @@ class product_code():
         else:
             self.table = 'productcode'
 
+        self.set_common_cols()
+
+        if columns is None and common_fields_only:
+            columns = self.common_cols
+
+        self.lazy_columns = [] if lazy_columns is None else list(lazy_columns)
+        self.arraysize = arraysize
+        self.batch_size = batch_size
+
         if keys is None:
             logger.info(f'{self.table}: You MUST pass a list of keys')
             return
         else:
-            sql = f'''select * from {self.table}
-                      where productcode_id||baxter_productcode in {keys}'''
             self.connection = connection
-            self.df = pd.read_sql(sql, connection)
-            self.df = self.df.fillna(np.NaN)
-            self.df = self.df.sort_values('PRODUCTCODE_ID')
-            self.df = self.df.reset_index(drop=True)
-
-            self.set_common_cols()
+            if isinstance(keys, str):
+                self.keys = keys
+            else:
+                self.keys = '(' + ', '.join([f"'{key}'" for key in keys]) + ')'
+
+            select_cols = self._get_select_columns(columns)
+
+            if snapshot is not None:
+                logger.info(f'{self.table}: lookup from local snapshot')
+                self.df = snapshot.lookup(keys, columns=select_cols)
+            else:
+                select_list = '*' if select_cols is None else ', '.join(select_cols)
+                frames = []
+                for keys_batch in self._get_key_batches():
+                    sql = f'''select {select_list} from {self.table}
+                              where productcode_id||baxter_productcode in {keys_batch}
+                              order by productcode_id'''
+                    frames.append(fetch_dataframe(self.connection, sql,
+                                                  arraysize=self.arraysize))
+
+                self.df = frames[0]
+                if len(frames) > 1:
+                    self.df = (pd.concat(frames, ignore_index=True)
+                                 .sort_values('PRODUCTCODE_ID', kind='mergesort')
+                                 .reset_index(drop=True))
+
+            self.df = CATEGORICAL_COLS().convert(self.df)
 
             total_rows, total_cols = self.df.shape
             logger.info(f'{self.table}: {total_rows} rows, {total_cols} columns.')
@@ -64,6 +124,9 @@ class product_code():
 
     def get_dataframe(self, common_fields_only:bool=True)-> pd.DataFrame:
 
+        required_cols = self.common_cols if common_fields_only else self.lazy_columns
+        self._fetch_lazy_columns(required_cols)
+
         if common_fields_only:
             logger.info(f'{self.table}: <<Common>> columns only')
             dx = self.df[self.common_cols]
@@ -75,6 +138,59 @@ class product_code():
 
         return dx
 
+    def _get_select_columns(self, columns: Optional[List[str]]) -> Optional[List[str]]:
+        ''' Projected column list (None = all), less any lazy columns '''
+
+        if columns is None and not self.lazy_columns:
+            return None
+
+        if columns is None:
+            # All columns except the lazy ones, need to know the table columns.
+            sql = f'select * from {self.table} where 1=2'
+            columns = fetch_dataframe(self.connection, sql).columns.tolist()
+
+        # Key columns are always required (sorting, lazy column lookup)
+        key_cols = ['PRODUCTCODE_ID', 'BAXTER_PRODUCTCODE']
+        select_cols = key_cols + [col for col in columns if col not in key_cols]
+        select_cols = [col for col in select_cols if col not in self.lazy_columns]
+
+        return select_cols
+
+    def _get_key_batches(self) -> List[str]:
+        ''' Split keys into SQL 'in' list strings of at most batch_size keys '''
+
+        keys = re.findall(r"'([^']*)'", self.keys)
+        if len(keys) <= self.batch_size:
+            return [self.keys]
+
+        return ['(' + ', '.join([f"'{key}'" for key in keys[i:i+self.batch_size]]) + ')'
+                for i in range(0, len(keys), self.batch_size)]
+
+    def _fetch_lazy_columns(self, columns: List[str]) -> None:
+        ''' Fetch (and merge) any required lazy columns not already loaded '''
+
+        lazy_cols = [col for col in columns
+                     if col in self.lazy_columns and col not in self.df.columns]
+        if not lazy_cols:
+            return
+
+        logger.info(f'{self.table}: fetching lazy columns {lazy_cols}')
+
+        key_cols = ['PRODUCTCODE_ID', 'BAXTER_PRODUCTCODE']
+        select_list = ', '.join(key_cols + lazy_cols)
+        frames = []
+        for keys_batch in self._get_key_batches():
+            sql = f'''select {select_list} from {self.table}
+                      where productcode_id||baxter_productcode in {keys_batch}'''
+            frames.append(fetch_dataframe(self.connection, sql, arraysize=self.arraysize))
+        df_lazy = pd.concat(frames, ignore_index=True)
+
+        for col in lazy_cols:
+            df_lazy[col] = df_lazy[col].map(
+                lambda x: x.read() if isinstance(x, cx_Oracle.LOB) else x)
+
+        self.df = self.df.merge(df_lazy, on=key_cols, how='left')
+
 
 class reimport_log():
     ''' Class to encapsulate the reimport_log table in ecat database '''
@@ -98,19 +214,20 @@ class reimport_log():
 
         self.table = table
         self.connection = connection
+        self.postgres = isinstance(connection, psycopg2.extensions.connection)
+        self.db_error = psycopg2.Error if self.postgres else cx_Oracle.DatabaseError
 
 
     def get_last_update(self) -> datetime:
         ''' Get last_update from table, return datetime object '''
 
-        parse_format = '%d-%b-%y %I.%M.%S.000000 %p'
-
         try:
             with self.connection.cursor() as c:
-                sql = f'select to_char(max(date_reimport_ts)) from {self.table}'
-                last_updated = c.execute(sql).fetchone()[0]
-                last_updated = datetime.strptime(last_updated, parse_format)
-        except cx_Oracle.DatabaseError as e:
+                # Timestamp is returned as a (native) datetime by the driver
+                sql = f'select max(date_reimport_ts) from {self.table}'
+                c.execute(sql)
+                last_updated = c.fetchone()[0]
+        except self.db_error as e:
             self.connection.rollback()
             logger.info(e)
 
@@ -123,81 +240,314 @@ class reimport_log():
         try:
             with self.connection.cursor() as c:
                 fields = '(date_reimport_ts, updated_p_pc, updated_pc)'
-                updated = file_updated.strftime('%d-%b-%y %I.%M.%S.000000 %p')
-                values = updated, "0", "0"
-                statement = f'insert into {self.table} {fields} VALUES{values}'
+                # Driver paramstyle: psycopg2 'format', cx_Oracle 'numeric'
+                binds = '%s, %s, %s' if self.postgres else ':1, :2, :3'
+                statement = f'insert into {self.table} {fields} VALUES({binds})'
                 logger.debug(statement)
-                c.execute(statement)
+                c.execute(statement, [file_updated, "0", "0"])
                 self.connection.commit()
-        except cx_Oracle.DatabaseError as e:
+        except self.db_error as e:
             self.connection.rollback()
             logger.info(e)
             return
 
-        logger.info(f'{self.table}: Inserted row: date_reimport_ts={updated}')
+        logger.info(f'{self.table}: Inserted row: date_reimport_ts={file_updated}')
 
 
 class reimport():
     ''' Class to encapsulate the reimport table in ecat database '''
 
-
     def __init__(self, connection: cx_Oracle.Connection,
                  table: str='temp_bp_class_reimport_data',) -> None:
         ''' '''
         self.table = table
         self.connection = connection
+        self.catalog = table_catalog(connection=connection)
 
     def get_columns(self) -> list:
+        ''' Return table column names (from the cached table catalog) '''
 
-        sql = f'select * from {self.table} where 1=2'
-        df = pd.read_sql(sql, self.connection).fillna(np.nan)
+        return self.catalog.get_columns(self.table)
 
-        return df.columns
-
-    def upload(self, df: pd.DataFrame) -> None:
+    def upload(self, df: pd.DataFrame, fingerprint: Optional[str]=None,
+               batch_size: int=10000, retry_failed: bool=False,
+               direct_path: bool=False, parallel: Optional[int]=None) -> bool:
         '''
         Upload pandas dataframe containing converted/validated reimport data
         to TEMP_BP_CLASS_REIMPORT_DATA table.
 
+        Oracle connections use array DML (executemany), PostgreSQL
+        connections use a bulk COPY (see _copy_rows()).
+
+        Rows are uploaded and committed in batches. After each commit the
+        batch offset is recorded in a checkpoint file, together with the
+        input fingerprint. If an upload fails part way, re-running it with
+        the same fingerprint resumes from the last committed batch (the
+        table is not truncated).
+
         Parameters
         ----------
         df
             pandas data frame
+        fingerprint
+            Default None (no checkpointing). Fingerprint of the input data,
+            e.g. CSV file hash + filter date. See artikel.get_fingerprint()
+        batch_size
+            Default 10000. Number of rows per batch/commit.
+        retry_failed
+            Default False. If True, retry (Oracle) rows rejected by the
+            array insert once more after type coercion.
+        direct_path
+            Default False. If True (Oracle), bulk load with direct-path array
+            inserts (APPEND_VALUES hint), i.e. above the high water mark with
+            minimal undo. Non-unique indexes are set unusable and primary
+            key, unique & foreign key constraints disabled for the load,
+            then rebuilt / re-enabled once it ends (see _defer_indexes()).
+            Direct-path inserts do not support batch errors, a rejected
+            row fails its batch (re-run to resume). Use a large batch_size,
+            each commit starts new blocks.
+        parallel
+            Default None. Degree of parallelism for parallel DML and the
+            index rebuild (direct_path only).
+
+        Oracle rows rejected by the (conventional) array insert are gathered
+        in one structured error file, see batch_error_sink.
 
         Returns
         -------
-        None
+        True if all batches were committed (and, direct_path, indexes
+        rebuilt & constraints enabled), otherwise False
         '''
+        postgres = isinstance(self.connection, psycopg2.extensions.connection)
+        db_error = psycopg2.Error if postgres else cx_Oracle.DatabaseError
+        rejects_table = f'{self.table}_rejects'
+        total_rows, total_rejected = df.shape[0], 0
+        statement = ''
+        direct_path = direct_path and not postgres
+        deferred: Optional[Tuple[List[str], List[str]]] = None
+        rebuilt = True
+
+        checkpoint = reimport_checkpoint(self.table, fingerprint, total_rows,
+                                         database=self.catalog.connection_key)
+        sink = batch_error_sink(df.columns)
+        start = checkpoint.get_offset()
+
         try:
             with self.connection.cursor() as cursor:
-                sql = f'truncate table {self.table}'
-                cursor.execute(sql)
-                self.connection.commit()
-                logger.debug(f'{self.table}: {sql}.')
+                if start == 0:
+                    sql = f'truncate table {self.table}'
+                    cursor.execute(sql)
+                    checkpoint.clear()
+                    logger.debug(f'{self.table}: {sql}.')
+                else:
+                    logger.info(f'{self.table}: Resuming upload from row {start}')
+
+                if postgres:
+                    sql = f'''create table if not exists {rejects_table}
+                              (row_offset integer, error text, row_data text,
+                               rejected_ts timestamp default current_timestamp)'''
+                    cursor.execute(sql)
+                else:
+                    col_positions = ', '.join([f':{col}' for col in range(1, df.shape[1]+1)])
+                    hint = ''
+                    if direct_path:
+                        degree = f' PARALLEL({self.table}, {parallel})' if parallel else ''
+                        hint = f'/*+ APPEND_VALUES{degree} */ '
+                        if parallel:
+                            cursor.execute('alter session enable parallel dml')
+                        # Filled as indexes / constraints are deferred, so that
+                        # a partially deferred set is restored (finally) as well.
+                        deferred = ([], [])
+                        self._defer_indexes(cursor, deferred)
+
+                    statement = f'insert {hint}into {self.table} values({col_positions})'
+                    logger.debug(statement)
+                    cursor.setinputsizes(*self.catalog.get_input_sizes(self.table))
 
-                col_positions = ', '.join([f':{col}' for col in range(1, df.shape[1]+1)])
-                statement = f'insert into {self.table} values({col_positions})'
-                logger.debug(statement)
-
-                row_values = self._prepare_rowvalues_for_db(df)
-                cursor.executemany(statement, row_values, batcherrors=True)
                 self.connection.commit()
 
-                for error in cursor.getbatcherrors():
-                    logger.info(f'Error @row {error.offset}: {error.message}')
-                    lastGoodRow = row_values[error.offset-1:error.offset]
-                    failedRow = row_values[error.offset:error.offset+1]
-                    logger.info("lastGoodRow: " + str(error.offset-1))
-                    logger.info(lastGoodRow)
-                    logger.info("failedRow: " + str(error.offset))
-                    logger.info(failedRow)
-
-        except cx_Oracle.DatabaseError as e:
+                for offset in range(start, total_rows, batch_size):
+                    if postgres:
+                        batch = df.iloc[offset:offset+batch_size]
+                        total_rejected += self._copy_rows(cursor, batch, offset, rejects_table)
+                    else:
+                        # Prepared per batch, to keep memory use to one batch
+                        batch_values = self._prepare_rowvalues_for_db(
+                            df.iloc[offset:offset+batch_size])
+                        total_rejected += self._insert_rows(cursor, statement,
+                                                            batch_values, offset, sink,
+                                                            batcherrors=not direct_path)
+
+                    self.connection.commit()
+                    checkpoint.save(min(offset + batch_size, total_rows))
+
+                if retry_failed and len(sink) > 0:
+                    total_rejected -= self._retry_rows(cursor, statement, sink)
+
+        except db_error as e:
             self.connection.rollback()
             logger.info(statement)
             logger.info(e)
+            if fingerprint is not None:
+                logger.info(f'{self.table}: Upload incomplete, re-run to resume.')
+            sink.write()
+            return False
+
+        finally:
+            if deferred is not None:
+                rebuilt = self._rebuild_indexes(deferred, parallel)
+
+        if not rebuilt:
+            # Rows are committed (checkpoint kept), a re-run only rebuilds
+            logger.info(f'{self.table}: Upload incomplete, indexes / constraints not rebuilt.')
+            sink.write()
+            return False
+
+        checkpoint.clear()
+        sink.write()
+
+        if total_rejected > 0:
+            logger.info(f'{self.table}: {total_rejected} rows rejected.')
+
+        logger.info(f'{self.table}: Inserted {total_rows - start - total_rejected} rows.')
+
+        return True
+
+
+    def _insert_rows(self, cursor, statement: str, row_values: list, offset: int,
+                     sink: 'batch_error_sink', batcherrors: bool=True) -> int:
+        ''' Array insert rows (batch errors allowed). Returns rejected row count '''
+
+        cursor.executemany(statement, row_values, batcherrors=batcherrors)
+        if not batcherrors:
+            return 0
+
+        errors = cursor.getbatcherrors()
+        for error in errors:
+            sink.add(offset + error.offset, error, row_values[error.offset])
+
+        return len(errors)
+
+
+    def _defer_indexes(self, cursor, deferred: Tuple[List[str], List[str]]) -> None:
+        ''' Set non-unique indexes unusable, disable key constraints (direct-path load)
+
+        Indexes already unusable and constraints already disabled (e.g. left
+        by an interrupted load) are rebuilt / enabled as well. Each index and
+        constraint is added to deferred (indexes, constraints) as soon as it
+        is deferred, so that a failure part way can still be restored.
+        '''
+        indexes, constraints = deferred
+
+        sql = '''select constraint_name, status from user_constraints
+                 where table_name = :1 and constraint_type in ('P', 'U', 'R')
+                 order by decode(constraint_type, 'R', 0, 1)'''
+        rows = cursor.execute(sql, [self.table.upper()]).fetchall()
+
+        for constraint, status in rows:
+            if status == 'ENABLED':
+                cursor.execute(f'alter table {self.table} disable constraint {constraint}')
+            constraints.append(constraint)
+
+        sql = '''select index_name from user_indexes
+                 where table_name = :1 and uniqueness = 'NONUNIQUE'
+                 and index_type not like 'LOB%' '''
+        rows = cursor.execute(sql, [self.table.upper()]).fetchall()
+
+        for (index,) in rows:
+            cursor.execute(f'alter index {index} unusable')
+            indexes.append(index)
 
-        logger.info(f'{self.table}: Inserted {df.shape[0]} rows.')
+        cursor.execute('alter session set skip_unusable_indexes = true')
+
+        logger.info(f'{self.table}: {len(indexes)} indexes unusable, '
+                    f'{len(constraints)} constraints disabled for direct-path load.')
+
+
+    def _rebuild_indexes(self, deferred: Tuple[List[str], List[str]],
+                         parallel: Optional[int]=None) -> bool:
+        ''' Rebuild indexes, enable constraints after a direct-path load, True if successful '''
+
+        indexes, constraints = deferred
+        degree = f' parallel {parallel}' if parallel else ''
+
+        try:
+            with self.connection.cursor() as cursor:
+                for index in indexes:
+                    cursor.execute(f'alter index {index} rebuild{degree}')
+                    if parallel:
+                        cursor.execute(f'alter index {index} noparallel')
+
+                # Primary / unique keys (which rebuild their indexes) before foreign keys
+                for constraint in reversed(constraints):
+                    cursor.execute(f'alter table {self.table} enable constraint {constraint}')
+
+        except cx_Oracle.DatabaseError as e:
+            logger.info(f'{self.table}: Index rebuild / constraint enable failed: {e}')
+            logger.info(f'{self.table}: Indexes {indexes}, constraints {constraints}')
+            return False
+
+        logger.info(f'{self.table}: {len(indexes)} indexes rebuilt, '
+                    f'{len(constraints)} constraints enabled.')
+
+        return True
+
+
+    def _retry_rows(self, cursor, statement: str, sink: 'batch_error_sink') -> int:
+        ''' Retry failed rows after type coercion. Returns recovered row count '''
+
+        offsets, row_values = sink.get_failed_rows()
+        row_values = [[_coerce_value(value) for value in row] for row in row_values]
+
+        cursor.executemany(statement, row_values, batcherrors=True)
+        self.connection.commit()
+
+        failed = {offsets[error.offset] for error in cursor.getbatcherrors()}
+        sink.set_retried(offsets, failed)
+
+        recovered = len(offsets) - len(failed)
+        logger.info(f'{self.table}: Retry recovered {recovered} of {len(offsets)} rows.')
+
+        return recovered
+
+
+    def _copy_rows(self, cursor, df: pd.DataFrame, offset: int,
+                   rejects_table: str) -> int:
+        ''' COPY rows to (PostgreSQL) table, streamed from an in-memory CSV buffer
+
+        The rows are copied inside a savepoint. If they are rejected they are
+        split in half and retried until the failing row(s) are found, these
+        are written to the <table>_rejects side table.
+
+        Returns rejected row count
+        '''
+
+        buffer = io.StringIO()
+        df.to_csv(buffer, sep=',', header=False, index=False,
+                  date_format='%Y-%m-%d %H:%M:%S')
+        buffer.seek(0)
+
+        cursor.execute('savepoint ecat_copy')
+        try:
+            sql = f'copy {self.table} from stdin with (format csv)'
+            cursor.copy_expert(sql, buffer)
+            cursor.execute('release savepoint ecat_copy')
+            return 0
+        except (psycopg2.DataError, psycopg2.IntegrityError) as e:
+            cursor.execute('rollback to savepoint ecat_copy')
+            error = str(e).strip()
+
+        if df.shape[0] == 1:
+            logger.debug(f'Error @row {offset}: {error}')
+            sql = f'insert into {rejects_table} (row_offset, error, row_data) values (%s, %s, %s)'
+            cursor.execute(sql, (offset, error, buffer.getvalue()))
+            return 1
+
+        half = df.shape[0] // 2
+        rejected = self._copy_rows(cursor, df.iloc[:half], offset, rejects_table)
+        rejected += self._copy_rows(cursor, df.iloc[half:], offset + half, rejects_table)
+
+        return rejected
 
 
     def _prepare_rowvalues_for_db(self, df:pd.DataFrame) -> list:
@@ -205,9 +555,13 @@ class reimport():
         '''
         dx = df.copy(deep=True)
 
-        db_datefmt = '%d-%b-%Y %I.%M.%S.00000000'
-        dx.DATE_APPROVED = dx.DATE_APPROVED.dt.strftime(db_datefmt)
-        dx.DATE_LASTMODIFIED = dx.DATE_LASTMODIFIED.dt.strftime(db_datefmt)
+        # Categoricals (UOM, flags) back to plain values for the DB driver
+        categorical_cols = dx.select_dtypes('category').columns
+        dx[categorical_cols] = dx[categorical_cols].astype(object)
+
+        # Dates are bound as native datetimes (no string formatting)
+        dx.DATE_APPROVED = to_db_dates(dx.DATE_APPROVED)
+        dx.DATE_LASTMODIFIED = to_db_dates(dx.DATE_LASTMODIFIED)
 
         row_values = dx.replace(to_replace={np.NaN: None})
         row_values = row_values.values.tolist()
@@ -215,3 +569,340 @@ class reimport():
         logger.debug(f'{self.table}: Date columns prepared for DB update')
 
         return row_values
+
+
+class analysis_stage():
+    ''' Class to encapsulate the classroom analysis staging table in ecat database
+
+    Used to compare classroom items with productcode / p_productcode inside
+    the database (set based), so that only differences are returned.
+
+    Example
+    -------
+    stage = analysis_stage(connection=con)
+    stage.load(df_common_classroom)
+    df_flags = stage.get_flags()
+    df_csv, df_product = stage.get_differences(published=False)
+
+    '''
+
+    def __init__(self, connection: cx_Oracle.Connection,
+                 table: str='temp_bp_class_analysis_stage') -> None:
+        ''' analysis stage constructor
+
+        Parameters
+        ----------
+        connection
+            database connection object
+        table
+            staging table name, created (global temporary table)
+            if it does not exist.
+
+        Returns
+        -------
+        None
+        '''
+        self.table = table
+        self.connection = connection
+        self.common_cols = COMMON_COLS().get()
+        self.key_cols = ['PRODUCTCODE_ID', 'BAXTER_PRODUCTCODE']
+
+        self.create()
+
+
+    def create(self) -> None:
+        ''' Create staging table (same common columns as productcode) '''
+
+        with self.connection.cursor() as cursor:
+            sql = 'select count(*) from user_tables where table_name = :1'
+            exists = cursor.execute(sql, [self.table.upper()]).fetchone()[0]
+            if exists:
+                return
+
+            select_list = ', '.join(self.common_cols)
+            sql = f'''create global temporary table {self.table}
+                      on commit preserve rows
+                      as select {select_list} from productcode where 1=2'''
+            cursor.execute(sql)
+
+        logger.info(f'{self.table}: created.')
+
+
+    def load(self, df: pd.DataFrame) -> bool:
+        ''' (Re)load classroom common columns into staging table
+
+        All rows are loaded or none: if any row fails, the load is rolled
+        back and False is returned, so that no analysis is made on a
+        partially loaded stage.
+        '''
+
+        columns = ', '.join(self.common_cols)
+        col_positions = ', '.join([f':{col}' for col in range(1, len(self.common_cols)+1)])
+        statement = f'insert into {self.table} ({columns}) values({col_positions})'
+
+        dx = df[self.common_cols].astype(object)
+        row_values = dx.where(dx.notna(), None).values.tolist()
+
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(f'delete from {self.table}')
+                cursor.executemany(statement, row_values, batcherrors=True)
+                errors = cursor.getbatcherrors()
+
+                if errors:
+                    self.connection.rollback()
+                    for error in errors:
+                        logger.info(f'{self.table}: Error @row {error.offset}: {error.message}')
+                    logger.info(f'{self.table}: {len(errors)} rows failed, load rolled back.')
+                    return False
+
+                self.connection.commit()
+
+        except cx_Oracle.DatabaseError as e:
+            self.connection.rollback()
+            logger.info(statement)
+            logger.info(e)
+            return False
+
+        logger.info(f'{self.table}: Inserted {len(row_values)} rows.')
+
+        return True
+
+
+    def get_flags(self) -> pd.DataFrame:
+        ''' Return PRODUCTCODE_ID with PRODUCT / P_PRODUCT existence flags '''
+
+        exists = lambda table: f'''case when exists (select 1 from {table} p
+                                     where p.productcode_id = s.productcode_id
+                                     and p.baxter_productcode = s.baxter_productcode)
+                                   then 1 else 0 end'''
+
+        sql = f'''select distinct s.productcode_id,
+                         {exists('productcode')} as product,
+                         {exists('p_productcode')} as p_product
+                  from {self.table} s
+                  order by s.productcode_id'''
+        df = fetch_dataframe(self.connection, sql)
+
+        df['PRODUCT'] = df['PRODUCT'] == 1
+        df['P_PRODUCT'] = df['P_PRODUCT'] == 1
+
+        return df
+
+
+    def get_differences(self, published: bool=False) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        ''' Return (staged, product) rows with at least one differing column
+
+        Only items that exist in both the staging table and product table
+        are considered. Differences are identified with MINUS so that only
+        differing rows are returned from the database.
+
+        Parameters
+        ----------
+        published
+            Default False. Compare with productcode table data
+            If True, compare with p_productcode table data
+
+        Returns
+        -------
+        Tuple of staged rows, product rows. Both sorted by PRODUCTCODE_ID,
+        BAXTER_PRODUCTCODE (the full key), so that rows are aligned.
+        '''
+        product_table = 'p_productcode' if published else 'productcode'
+        select_list = ', '.join(self.common_cols)
+
+        common = lambda x, y: f'''exists (select 1 from {y} o
+                                  where o.productcode_id = {x}.productcode_id
+                                  and o.baxter_productcode = {x}.baxter_productcode)'''
+
+        stage_rows = f'select {select_list} from {self.table} s where {common("s", product_table)}'
+        product_rows = f'select {select_list} from {product_table} p where {common("p", self.table)}'
+
+        order_by = ', '.join(self.key_cols)
+
+        sql = f'{stage_rows} minus {product_rows} order by {order_by}'
+        df_stage = fetch_dataframe(self.connection, sql)
+
+        sql = f'{product_rows} minus {stage_rows} order by {order_by}'
+        df_product = fetch_dataframe(self.connection, sql)
+
+        # Only keep items with differences on both sides (aligned rows)
+        stage_keys = pd.MultiIndex.from_frame(df_stage[self.key_cols])
+        product_keys = pd.MultiIndex.from_frame(df_product[self.key_cols])
+        df_stage = df_stage[stage_keys.isin(product_keys)].reset_index(drop=True)
+        df_product = df_product[product_keys.isin(stage_keys)].reset_index(drop=True)
+
+        logger.info(f'{self.table} vs {product_table}: {df_stage.shape[0]} rows with differences.')
+
+        return df_stage, df_product
+
+
+class reimport_checkpoint():
+    ''' Class to encapsulate the reimport upload checkpoint (json) file '''
+
+    def __init__(self, table: str, fingerprint: Optional[str], total_rows: int,
+                 database: str, filename: Union[None, str, Path]=None) -> None:
+        ''' reimport checkpoint constructor
+
+        Parameters
+        ----------
+        table
+            table name
+        fingerprint
+            fingerprint of the input data. If None, checkpointing is disabled.
+        total_rows
+            total rows to upload
+        database
+            database/connection identity (user@dsn), see table_catalog.connection_key.
+            An upload only resumes against the same database.
+        filename
+            Default None ('outputs/ECAT_reimport_checkpoint_<database>.json').
+            checkpoint file name
+
+        Returns
+        -------
+        None
+        '''
+        self.table = table
+        self.fingerprint = fingerprint
+        self.total_rows = total_rows
+        self.database = database
+
+        if filename is None:
+            name = re.sub(r'[^\w.-]+', '_', database)
+            filename = f'outputs/ECAT_reimport_checkpoint_{name}.json'
+        self.filename = Path(filename)
+
+    def get_offset(self) -> int:
+        ''' Return committed row offset to resume from (0 = start again) '''
+
+        if self.fingerprint is None or not self.filename.exists():
+            return 0
+
+        with open(self.filename) as f:
+            checkpoint = json.load(f)
+
+        same_upload = (checkpoint.get('database') == self.database and
+                       checkpoint.get('table') == self.table and
+                       checkpoint.get('fingerprint') == self.fingerprint and
+                       checkpoint.get('total_rows') == self.total_rows)
+
+        return checkpoint.get('offset', 0) if same_upload else 0
+
+    def save(self, offset: int) -> None:
+        ''' Record committed row offset '''
+
+        if self.fingerprint is None:
+            return
+
+        checkpoint = {'database': self.database, 'table': self.table,
+                      'fingerprint': self.fingerprint,
+                      'total_rows': self.total_rows, 'offset': offset}
+
+        self.filename.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.filename, 'w') as f:
+            json.dump(checkpoint, f)
+
+    def clear(self) -> None:
+        ''' Remove checkpoint (upload complete) '''
+
+        if self.fingerprint is not None and self.filename.exists():
+            self.filename.unlink()
+
+
+class batch_error_sink():
+    ''' Class to gather (array insert) batch errors into one structured file
+
+    Rather than logging each failing row, errors are collected with the
+    row offset, Oracle error code / message and key columns and written
+    to a single CSV file once the upload has finished.
+    '''
+
+    def __init__(self, columns: pd.Index,
+                 filename: str='outputs/ECAT_reimport_errors.csv',
+                 key_cols: Optional[List[str]]=None) -> None:
+        ''' batch error sink constructor
+
+        Parameters
+        ----------
+        columns
+            columns of the uploaded dataframe (row value positions)
+        filename
+            CSV error file name (date prefixed)
+        key_cols
+            Default ['PRODUCTCODE_ID', 'BAXTER_PRODUCTCODE']. Columns
+            identifying the failing rows in the error file.
+
+        Returns
+        -------
+        None
+        '''
+        self.filename = filename
+        if key_cols is None:
+            key_cols = ['PRODUCTCODE_ID', 'BAXTER_PRODUCTCODE']
+
+        self.key_positions = {col: list(columns).index(col)
+                              for col in key_cols if col in columns}
+        self.errors: List[dict] = []
+        self.rows: List[list] = []
+
+    def __len__(self) -> int:
+        return len(self.errors)
+
+    def add(self, offset: int, error, row: list) -> None:
+        ''' Add batch error (cx_Oracle batch error object) for row at offset '''
+
+        record = {'ROW_OFFSET': offset, 'ERROR_CODE': error.code,
+                  'ERROR_MESSAGE': error.message.strip(), 'RETRIED': ''}
+        for col, position in self.key_positions.items():
+            record[col] = row[position]
+
+        self.errors.append(record)
+        self.rows.append(row)
+
+    def get_failed_rows(self) -> Tuple[List[int], List[list]]:
+        ''' Return (offsets, row values) of failed rows '''
+
+        return [error['ROW_OFFSET'] for error in self.errors], self.rows
+
+    def set_retried(self, offsets: List[int], failed: set) -> None:
+        ''' Record retry outcome (recovered/failed) for given offsets '''
+
+        retried = set(offsets)
+        for error in self.errors:
+            if error['ROW_OFFSET'] in retried:
+                error['RETRIED'] = 'failed' if error['ROW_OFFSET'] in failed else 'recovered'
+
+    def write(self) -> None:
+        ''' Write all gathered errors to the (CSV) error file '''
+
+        if not self.errors:
+            return
+
+        filename = get_filename(self.filename)
+        df = pd.DataFrame(self.errors)
+        df.to_csv(filename, index=False)
+
+        summary = df['ERROR_CODE'].value_counts().to_dict()
+        logger.info(f'{len(self.errors)} batch errors (ORA code: rows {summary}) -> {filename}')
+
+
+def _coerce_value(value):
+    ''' Coerce (failed row) value: trim strings, decimal comma to number
+
+    Digit only strings are left alone, they may be codes with leading zeros.
+    '''
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+
+    if not isinstance(value, str):
+        return value
+
+    value = value.strip()
+    if value == '':
+        return None
+
+    if re.fullmatch(r'-?\d+,\d+', value):
+        return float(value.replace(',', '.'))
+
+    return value
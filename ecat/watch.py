@@ -0,0 +1,278 @@
+import json
+import time
+import shutil
+import logging
+import cx_Oracle
+from pathlib import Path
+from datetime import datetime
+from typing import Optional, Dict
+from ecat.db import Connections
+
+logger = logging.getLogger(__name__)
+
+
+class processed_files():
+    ''' Class to encapsulate the record of already processed export files
+
+    Example
+    -------
+    processed = processed_files('outputs/ECAT_processed_files.json')
+    if not processed.contains(filename):
+        ...
+        processed.add(filename)
+
+    '''
+
+    def __init__(self, filename: str='outputs/ECAT_processed_files.json') -> None:
+        '''
+        Parameters
+        ----------
+        filename
+            json file recording processed export files.
+            Created on first add() if it does not exist.
+
+        Returns
+        -------
+        None
+
+        '''
+        self.filename = Path(filename)
+        self.files: Dict[str, dict] = {}
+
+        if self.filename.exists():
+            with open(self.filename) as f:
+                self.files = json.load(f)
+
+        logger.info(f'{self.filename}: {len(self.files)} processed files.')
+
+
+    def contains(self, filename: Path) -> bool:
+        ''' Has filename (same name, same size) already been processed '''
+
+        entry = self.files.get(Path(filename).name)
+        if entry is None:
+            return False
+
+        return entry['size'] == Path(filename).stat().st_size
+
+
+    def add(self, filename: Path) -> None:
+        ''' Record filename as processed and save to disk '''
+
+        self.files[Path(filename).name] = {
+            'size': Path(filename).stat().st_size,
+            'processed': "{:%Y-%m-%d %H:%M:%S}".format(datetime.now())}
+
+        self.filename.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.filename, 'w') as f:
+            json.dump(self.files, f, indent=4)
+
+
+class watcher():
+    ''' Class to encapsulate watching the inputs directory for new exports
+
+    A single database connection is opened and kept for the lifetime
+    of the watcher. Each new (complete) export file is analysed and
+    uploaded as soon as it arrives, then recorded as processed so that
+    a restart does not redo work. Only files that were processed
+    successfully are recorded. A file that fails is retried at the next
+    poll, after max_attempts failures (or on an unexpected error) it is
+    moved to the quarantine directory.
+
+    Example
+    -------
+    from ecat.watch import watcher
+
+    w = watcher(directory='inputs', database='eCatalogDEV', update=True)
+    w.run()
+
+    '''
+
+    def __init__(self, directory: str='inputs', database: str='eCatalogDEV',
+                 pattern: str='export_artikel_*.csv', interval: int=60,
+                 update: bool=False, analyse: bool=True,
+                 state_file: str='outputs/ECAT_processed_files.json',
+                 max_attempts: int=3, quarantine: Optional[str]=None) -> None:
+        '''
+        Parameters
+        ----------
+        directory
+            Default 'inputs'. Directory to monitor for export files.
+        database
+            name of e-Catalogue database.
+            Valid values are: eCatalogDEV, eCatalogPRD
+        pattern
+            Default 'export_artikel_*.csv'. Export filename (glob) pattern.
+        interval
+            Default 60. Seconds to wait between directory polls.
+        update
+            Default False. If True, upload/merge CSV data with reimport table.
+        analyse
+            Default True. If True, analyse each file before uploading.
+        state_file
+            json file recording processed export files.
+        max_attempts
+            Default 3. Number of times a failing file is retried before
+            it is quarantined.
+        quarantine
+            Default None (<directory>/quarantine). Directory failed files
+            are moved to.
+
+        Returns
+        -------
+        None
+
+        '''
+        self.directory = Path(directory)
+        self.database = database
+        self.pattern = pattern
+        self.interval = interval
+        self.update = update
+        self.analyse = analyse
+        self.processed = processed_files(state_file)
+        self.max_attempts = max_attempts
+        self.quarantine = Path(quarantine) if quarantine else self.directory / 'quarantine'
+        self._attempts: Dict[str, int] = {}
+        self.connection: Optional[cx_Oracle.Connection] = None
+
+        # File sizes seen at the previous poll, used to make sure that a
+        # file is no longer being written before it is picked up.
+        self._sizes: Dict[str, int] = {}
+
+
+    def get_connection(self) -> Optional[cx_Oracle.Connection]:
+        ''' Return open (warm) connection, reconnect if it has dropped '''
+
+        if self.connection is not None:
+            try:
+                self.connection.ping()
+            except cx_Oracle.Error as e:
+                logger.info(f'{self.database}: connection lost ({e}), reconnecting')
+                self.connection = None
+
+        if self.connection is None:
+            self.connection = Connections().get_connection(self.database)
+
+        return self.connection
+
+
+    def get_new_files(self) -> list:
+        ''' Return export files that are complete and not yet processed '''
+
+        new_files = []
+        for filename in sorted(self.directory.glob(self.pattern)):
+
+            if self.processed.contains(filename):
+                continue
+
+            size = filename.stat().st_size
+            previous_size = self._sizes.get(filename.name)
+            self._sizes[filename.name] = size
+
+            if previous_size == size:
+                new_files.append(filename)
+            else:
+                logger.debug(f'{filename}: size changed, waiting for next poll')
+
+        return new_files
+
+
+    def process(self, filename: Path) -> bool:
+        ''' Analyse and upload a single export file, True if successful '''
+
+        # Import here, ecat.ecat imports this module.
+        from ecat.ecat import classroom_run, classroom_upload
+
+        con = self.get_connection()
+        if con is None:
+            return False
+
+        logger.info('')
+        logger.info(f'<< WATCH: processing {filename} >>')
+
+        if self.analyse:
+            # Analysis & upload share one parsed/filtered dataset
+            completed = classroom_run(filename, database=self.database, update=self.update,
+                                      render=False, connection=con)
+        else:
+            completed = classroom_upload(filename, database=self.database,
+                                         update=self.update, connection=con)
+
+        if completed:
+            self.processed.add(filename)
+            self._attempts.pop(filename.name, None)
+
+        return completed
+
+
+    def failed(self, filename: Path, error: Optional[Exception]=None) -> None:
+        ''' Count failed attempt, quarantine file after max_attempts (or error) '''
+
+        attempts = self._attempts.get(filename.name, 0) + 1
+        self._attempts[filename.name] = attempts
+
+        if error is None and attempts < self.max_attempts:
+            logger.info(f'{filename}: processing failed (attempt {attempts} of '
+                        f'{self.max_attempts}), retrying at next poll')
+            return
+
+        self._attempts.pop(filename.name, None)
+        self._sizes.pop(filename.name, None)
+
+        try:
+            self.quarantine.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(filename), str(self.quarantine / filename.name))
+        except OSError as e:
+            # Cannot move it, record it so that it is skipped from now on
+            logger.info(f'{filename}: cannot quarantine ({e}), skipping file')
+            self.processed.add(filename)
+            return
+
+        logger.info(f'{filename}: processing failed, moved to {self.quarantine}')
+
+
+    def run(self, max_polls: Optional[int]=None) -> None:
+        ''' Poll directory for new export files until interrupted
+
+        Parameters
+        ----------
+        max_polls
+            Default None (run forever). Number of directory polls to make.
+
+        Returns
+        -------
+        None
+        '''
+        logger.info(f'Watching {self.directory / self.pattern} every {self.interval}s')
+
+        polls = 0
+        try:
+            while max_polls is None or polls < max_polls:
+                new_files = self.get_new_files()
+                if new_files and self.get_connection() is None:
+                    # No database, not a problem of the files: retry them all
+                    new_files = []
+
+                for filename in new_files:
+                    try:
+                        if not self.process(filename):
+                            self.failed(filename)
+                    except cx_Oracle.Error as e:
+                        # Possibly a database (connection) problem: retry
+                        logger.info(f'{filename}: processing failed: {e}')
+                        self.failed(filename)
+                    except Exception as e:
+                        logger.exception(f'{filename}: processing failed: {e}')
+                        self.failed(filename, error=e)
+
+                polls += 1
+                if max_polls is None or polls < max_polls:
+                    time.sleep(self.interval)
+
+        except KeyboardInterrupt:
+            logger.info('Watch stopped.')
+
+        finally:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
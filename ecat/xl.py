@@ -1,7 +1,11 @@
 import pandas as pd
 import logging
+import openpyxl
 from pathlib import Path
 from datetime import datetime
+from typing import Optional, List, Tuple
+from concurrent.futures import ProcessPoolExecutor, Future
+from ecat.sidecar import write_sidecar
 
 logger = logging.getLogger(__name__)
 
@@ -36,7 +40,9 @@ def _calc_width(df):
 
 def write_excel(df: pd.DataFrame, filename: str='outputs/Book1.xlsx',
                 date_prefix: bool=True, sheet_name: str='Sheet1',
-                freeze_panes: tuple=(1, 0)) -> None:
+                freeze_panes: tuple=(1, 0),
+                scheduler: Optional['excel_scheduler']=None,
+                sidecar: bool=False) -> None:
     ''' For given dataframe export/write to Excel
 
     Parameters
@@ -54,6 +60,13 @@ def write_excel(df: pd.DataFrame, filename: str='outputs/Book1.xlsx',
         Default 'Sheet1'. Excel worksheet name
     freeze_panes
         Default (1, 0). Freeze first line of worksheet.
+    scheduler
+        Default None, write workbook now. If given, hand the workbook
+        to the excel_scheduler to be written in a worker process.
+    sidecar
+        Default False. If True, also write a typed parquet 'sidecar' file
+        (same name, .parquet suffix) for programmatic consumers, see
+        ecat.sidecar.
 
 
     Returns
@@ -61,12 +74,13 @@ def write_excel(df: pd.DataFrame, filename: str='outputs/Book1.xlsx',
     None
 
     '''
+    if scheduler is not None:
+        scheduler.submit(df, filename=filename, date_prefix=date_prefix,
+                         sheet_name=sheet_name, freeze_panes=freeze_panes,
+                         sidecar=sidecar)
+        return
 
-    filename_ = Path(filename)
-
-    if date_prefix:
-        ts = "{:%Y%m%d_}".format(datetime.now())
-        filename_ = filename_.parents[0] / f'{ts}{filename_.stem}{filename_.suffix}'
+    filename_ = get_filename(filename, date_prefix=date_prefix)
 
     # Remove underscores from column headings (they mess up formatting headings)
     columns = df.columns.str.replace('_', ' ')
@@ -92,3 +106,169 @@ def write_excel(df: pd.DataFrame, filename: str='outputs/Book1.xlsx',
         # ws.set_column(0, max_col - 1, 18)
 
     logger.info(f'{filename_} ({sheet_name}) created.')
+
+    if sidecar:
+        write_sidecar(df, filename_.with_suffix('.parquet'), workbook=filename_)
+
+
+def get_filename(filename: str, date_prefix: bool=True) -> Path:
+    ''' Return output filename, with date prefix (e.g. 20221008_Book1.xlsx) '''
+
+    filename_ = Path(filename)
+
+    if date_prefix:
+        ts = "{:%Y%m%d_}".format(datetime.now())
+        filename_ = filename_.parents[0] / f'{ts}{filename_.stem}{filename_.suffix}'
+
+    return filename_
+
+
+def read_excel_columns(filename: str, columns: List[str],
+                       bool_cols: Optional[List[str]]=None,
+                       sheet_name: Optional[str]=None) -> pd.DataFrame:
+    ''' Stream (read only) selected columns from an Excel workbook
+
+    Rows are streamed from the worksheet (openpyxl read only mode) and only
+    the requested columns are kept. Boolean (flag) columns are coerced as
+    they are read, so hand-edited values such as 'TRUE', 'x', 1 or an
+    empty cell become True / False.
+
+    Parameters
+    ----------
+    filename
+        Excel workbook name
+    columns
+        column names to read. Heading spaces are treated as underscores,
+        e.g. 'ARTICLE STATUS' is read as ARTICLE_STATUS.
+    bool_cols
+        Default None. Columns (in columns) to coerce to boolean.
+    sheet_name
+        Default None (first worksheet). Worksheet name.
+
+    Returns
+    -------
+    pandas dataframe
+    '''
+    bool_cols = [] if bool_cols is None else bool_cols
+
+    wb = openpyxl.load_workbook(filename, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0] if sheet_name is None else wb[sheet_name]
+        rows = ws.iter_rows(values_only=True)
+
+        headings = [str(value).strip().replace(' ', '_') for value in next(rows)]
+        missing = [col for col in columns if col not in headings]
+        if missing:
+            raise KeyError(f'{filename}: columns not found {missing}')
+
+        positions = [headings.index(col) for col in columns]
+        coerce = [_to_bool if col in bool_cols else None for col in columns]
+        data: List[list] = [[] for col in columns]
+
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+
+            for values, position, func in zip(data, positions, coerce):
+                value = row[position] if position < len(row) else None
+                values.append(value if func is None else func(value))
+    finally:
+        wb.close()
+
+    df = pd.DataFrame(dict(zip(columns, data)))
+    logger.info(f'{filename}: {df.shape[0]} rows, {df.shape[1]} columns (streamed).')
+
+    return df
+
+
+def _to_bool(value) -> bool:
+    ''' Coerce (hand-edited) Excel flag value to boolean '''
+
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', 'yes', 'y', 'x', '1', 'wahr')
+
+    return bool(value)
+
+
+class excel_scheduler():
+    ''' Class to write (independent) Excel workbooks concurrently
+
+    Excel serialisation is CPU bound. Workbooks submitted to the scheduler
+    are written in worker processes while the main pipeline keeps going.
+    Leaving the 'with' block waits for all workbooks to be written.
+
+    Example
+    -------
+    with excel_scheduler() as scheduler:
+        write_excel(df1, filename='outputs/Book1.xlsx', scheduler=scheduler)
+        write_excel(df2, filename='outputs/Book2.xlsx', scheduler=scheduler)
+
+    NOTE: On Windows, scripts using this must be guarded with
+    if __name__ == '__main__': (worker processes re-import the script)
+
+    '''
+
+    def __init__(self, processes: Optional[int]=None) -> None:
+        '''
+        Parameters
+        ----------
+        processes
+            Default None (os.cpu_count()). Number of worker processes.
+            If 0, workbooks are written immediately in this process.
+
+        Returns
+        -------
+        None
+
+        '''
+        self.executor = None
+        if processes != 0:
+            self.executor = ProcessPoolExecutor(max_workers=processes)
+
+        self.futures: List[Tuple[str, Future]] = []
+
+    def __enter__(self) -> 'excel_scheduler':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def submit(self, df: pd.DataFrame, **kwargs) -> None:
+        ''' Schedule write_excel(df, **kwargs) '''
+
+        if self.executor is None:
+            write_excel(df, **kwargs)
+            return
+
+        future = self.executor.submit(write_excel, df, **kwargs)
+        self.futures.append((kwargs.get('filename', ''), future))
+        logger.debug(f'{kwargs.get("filename")}: scheduled.')
+
+    def wait(self) -> None:
+        ''' Wait for all scheduled workbooks to be written
+
+        Every failed workbook is logged, then the first error is raised
+        once all workbooks are done.
+        '''
+        futures, self.futures = self.futures, []
+        errors = []
+
+        for filename, future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                logger.info(f'{filename}: Error writing workbook: {e}')
+                errors.append(e)
+
+        if errors:
+            raise errors[0]
+
+    def close(self) -> None:
+        ''' Wait for scheduled workbooks, then shutdown worker processes '''
+
+        try:
+            self.wait()
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
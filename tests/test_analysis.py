@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+from ecat.analysis import normalize_types
+
+
+def test_int_vs_float_compare_equal():
+    df1 = pd.DataFrame({'A': [1, 2, 3]})
+    df2 = pd.DataFrame({'A': [1.0, 2.0, 3.0]})
+
+    df1, df2 = normalize_types(df1, df2)
+
+    assert df1['A'].dtype == df2['A'].dtype == 'float64'
+    assert df1.compare(df2).empty
+
+
+def test_none_nan_and_blank_are_null():
+    df1 = pd.DataFrame({'A': ['x ', None, '']})
+    df2 = pd.DataFrame({'A': ['x', np.nan, np.nan]})
+
+    df1, df2 = normalize_types(df1, df2)
+
+    assert df1.compare(df2).empty
+    assert df1['A'].dtype == df2['A'].dtype
+
+
+def test_numeric_text_falls_back_to_text():
+    df1 = pd.DataFrame({'A': [1, 2]})
+    df2 = pd.DataFrame({'A': ['1', 'two']})
+
+    df1, df2 = normalize_types(df1, df2)
+
+    assert list(df1.compare(df2).index) == [1]
+
+
+def test_dates_vs_strings():
+    df1 = pd.DataFrame({'D': pd.to_datetime(['2022-02-04 20:02:53', None])})
+    df2 = pd.DataFrame({'D': ['2022-02-04 20:02:53', None]})
+
+    df1, df2 = normalize_types(df1, df2)
+
+    assert df1.compare(df2).empty
+
+
+def test_bool_untouched_and_inputs_not_modified():
+    df1 = pd.DataFrame({'B': [True, False], 'A': [1, 2]})
+    df2 = pd.DataFrame({'B': [True, True], 'A': [1, 2]})
+
+    n1, n2 = normalize_types(df1, df2)
+
+    assert n1['B'].dtype == bool
+    assert df1['A'].dtype == 'int64'
+    assert list(n1.compare(n2).columns.get_level_values(0).unique()) == ['B']
+
+
+def test_categorical_int_vs_float_compare_equal():
+    df1 = pd.DataFrame({'DEHP_FREE': pd.Categorical([1, 0, 1]),
+                        'VOLUME_UOM': pd.Categorical(['ML', 'L', None])})
+    df2 = pd.DataFrame({'DEHP_FREE': pd.Categorical([1.0, 0.0, 1.0]),
+                        'VOLUME_UOM': pd.Categorical(['ML', 'L ', None])})
+
+    df1, df2 = normalize_types(df1, df2)
+
+    assert df1['DEHP_FREE'].dtype == 'float64'
+    assert df1.compare(df2).empty
+
+
+def test_categorical_with_nulls_is_numeric():
+    df1 = pd.DataFrame({'DEHP_FREE': pd.Categorical([1, None, 0])})
+    df2 = pd.DataFrame({'DEHP_FREE': [1.0, np.nan, 1.0]})
+
+    df1, df2 = normalize_types(df1, df2)
+
+    assert df1['DEHP_FREE'].dtype == 'float64'
+    assert list(df1.compare(df2).index) == [2]
@@ -0,0 +1,53 @@
+from ecat.tables import reimport_checkpoint
+
+
+def test_resume_same_upload(tmp_path):
+    filename = tmp_path / 'checkpoint.json'
+    checkpoint = reimport_checkpoint('t', 'abc', 100, database='u@dev', filename=filename)
+    checkpoint.save(40)
+
+    resumed = reimport_checkpoint('t', 'abc', 100, database='u@dev', filename=filename)
+    assert resumed.get_offset() == 40
+
+
+def test_no_resume_other_database(tmp_path):
+    filename = tmp_path / 'checkpoint.json'
+    reimport_checkpoint('t', 'abc', 100, database='u@dev', filename=filename).save(40)
+
+    other = reimport_checkpoint('t', 'abc', 100, database='u@prd', filename=filename)
+    assert other.get_offset() == 0
+
+
+def test_no_resume_other_fingerprint_or_size(tmp_path):
+    filename = tmp_path / 'checkpoint.json'
+    reimport_checkpoint('t', 'abc', 100, database='u@dev', filename=filename).save(40)
+
+    assert reimport_checkpoint('t', 'xyz', 100, database='u@dev', filename=filename).get_offset() == 0
+    assert reimport_checkpoint('t', 'abc', 101, database='u@dev', filename=filename).get_offset() == 0
+
+
+def test_filename_per_database():
+    dev = reimport_checkpoint('t', 'abc', 100, database='ecat@dev-host:1521/DEV')
+    prd = reimport_checkpoint('t', 'abc', 100, database='ecat@prd-host:1521/PRD')
+
+    assert dev.filename != prd.filename
+    assert '/' not in dev.filename.name
+
+
+def test_clear(tmp_path):
+    filename = tmp_path / 'checkpoint.json'
+    checkpoint = reimport_checkpoint('t', 'abc', 100, database='u@dev', filename=filename)
+    checkpoint.save(40)
+    checkpoint.clear()
+
+    assert not filename.exists()
+    assert checkpoint.get_offset() == 0
+
+
+def test_disabled_without_fingerprint(tmp_path):
+    filename = tmp_path / 'checkpoint.json'
+    checkpoint = reimport_checkpoint('t', None, 100, database='u@dev', filename=filename)
+    checkpoint.save(40)
+
+    assert not filename.exists()
+    assert checkpoint.get_offset() == 0
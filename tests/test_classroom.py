@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from ecat.classroom import artikel
+
+
+def make_artikel(df):
+    ''' artikel holding the given (already converted) data, no CSV needed '''
+
+    classroom_data = artikel.__new__(artikel)
+    classroom_data.filename = Path('export_artikel_20220204200253.csv')
+    classroom_data.df = df
+    classroom_data.duplicates_dropped = 0
+
+    return classroom_data
+
+
+def test_drop_duplicates_keeps_latest_row():
+    df = pd.DataFrame({'PRODUCTCODE_ID': [2, 1, 2, 1, 3],
+                       'DATE_LASTMODIFIED': pd.to_datetime(['2022-01-02', '2022-01-01',
+                                                            '2022-01-01', '2022-01-03',
+                                                            '2022-01-01']),
+                       'NAME': ['2 new', '1 old', '2 old', '1 new', '3']})
+    classroom_data = make_artikel(df)
+
+    df = classroom_data.drop_duplicates()
+
+    assert df['PRODUCTCODE_ID'].tolist() == [1, 2, 3]
+    assert df['NAME'].tolist() == ['1 new', '2 new', '3']
+    assert classroom_data.duplicates_dropped == 2
+
+
+def test_drop_duplicates_keeps_null_keys():
+    df = pd.DataFrame({'PRODUCTCODE_ID': [1, np.nan, np.nan],
+                       'DATE_LASTMODIFIED': pd.to_datetime(['2022-01-01'] * 3),
+                       'NAME': ['1', 'null a', 'null b']})
+    classroom_data = make_artikel(df)
+
+    df = classroom_data.drop_duplicates()
+
+    assert df['NAME'].tolist() == ['1', 'null a', 'null b']
+    assert classroom_data.duplicates_dropped == 0
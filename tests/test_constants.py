@@ -0,0 +1,13 @@
+import pandas as pd
+from ecat.constants import STATUS
+
+
+def test_status_descriptions_keep_unknown_codes():
+    codes = pd.Series([10260, 0, None, 10264])
+
+    desc = STATUS().to_categorical(codes)
+
+    assert desc.tolist()[:2] == ['Approved', 'Unknown']
+    assert pd.isna(desc[2])
+    assert desc[3] == 'Obsolete'
+    assert desc.dtype == STATUS().get_dtype()
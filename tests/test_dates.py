@@ -0,0 +1,34 @@
+import pandas as pd
+from datetime import datetime
+from ecat.dates import parse_dates, parse_date, to_db_dates
+
+
+def test_parse_dates_fixed_format():
+    dates = parse_dates(pd.Series(['2022-02-04 20:02:53', None], name='DATE_LASTMODIFIED'))
+
+    assert dates.tolist()[0] == pd.Timestamp('2022-02-04 20:02:53')
+    assert pd.isna(dates.tolist()[1])
+
+
+def test_parse_dates_falls_back_to_inference():
+    dates = parse_dates(pd.Series(['2022-02-04 20:02:53', '2022-02-05'], name='DATE_APPROVED'))
+
+    assert dates.tolist() == [pd.Timestamp('2022-02-04 20:02:53'), pd.Timestamp('2022-02-05')]
+
+
+def test_parse_dates_keeps_datetimes():
+    values = pd.Series(pd.to_datetime(['2022-02-04']))
+
+    assert parse_dates(values) is values
+
+
+def test_parse_date_sources():
+    assert parse_date('20220204200253') == datetime(2022, 2, 4, 20, 2, 53)
+    assert parse_date('20211102', source='override') == datetime(2021, 11, 2)
+
+
+def test_to_db_dates():
+    values = to_db_dates(pd.Series(pd.to_datetime(['2022-02-04', None])))
+
+    assert values.tolist() == [pd.Timestamp('2022-02-04'), None]
+    assert values.dtype == object
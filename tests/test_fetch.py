@@ -0,0 +1,96 @@
+import cx_Oracle
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from ecat.fetch import fetch_dataframe, fetch_chunks
+
+
+class fake_cursor():
+    ''' DB API cursor returning canned rows, arraysize rows per fetchmany() '''
+
+    def __init__(self, description, rows):
+        self.description = description
+        self.rows = rows
+        self.arraysize = 1
+        self.executed = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+        self.position = 0
+
+    def fetchmany(self):
+        rows = self.rows[self.position:self.position + self.arraysize]
+        self.position += len(rows)
+        return rows
+
+
+class fake_connection():
+
+    def __init__(self, description, rows):
+        self.cursor_ = fake_cursor(description, rows)
+
+    def cursor(self):
+        return self.cursor_
+
+
+# name, type_code, display_size, internal_size, precision, scale, null_ok
+ORACLE = [('ID', cx_Oracle.DB_TYPE_NUMBER, None, None, 10, 0, None),
+          ('PRICE', cx_Oracle.DB_TYPE_NUMBER, None, None, 10, 2, None),
+          ('BIG_ID', cx_Oracle.DB_TYPE_NUMBER, None, None, 20, 0, None),
+          ('NAME', cx_Oracle.DB_TYPE_VARCHAR, None, None, None, None, None),
+          ('MODIFIED', cx_Oracle.DB_TYPE_DATE, None, None, None, None, None),
+          ('OPT_ID', cx_Oracle.DB_TYPE_NUMBER, None, None, 10, 0, None)]
+
+ROWS = [(1, 1.5, 12345678901234567890, 'a', datetime(2022, 1, 1), 7),
+        (2, None, 2, None, None, None),
+        (3, 3.25, 3, 'c', datetime(2022, 1, 3), 9),
+        (4, 4.0, 4, 'd', datetime(2022, 1, 4), 10),
+        (5, 5.0, 5, 'e', datetime(2022, 1, 5), 11)]
+
+
+def test_fetch_dataframe_types():
+    con = fake_connection(ORACLE, ROWS)
+
+    df = fetch_dataframe(con, 'select * from t where id > :1', params=[0], arraysize=2)
+
+    assert con.cursor_.executed == [('select * from t where id > :1', [0])]
+    assert con.cursor_.arraysize == 2
+    assert df.shape == (5, 6)  # grown beyond arraysize
+    assert df['ID'].dtype == 'int64'
+    assert df['PRICE'].dtype == 'float64' and np.isnan(df['PRICE'][1])
+    assert df['BIG_ID'].dtype == object and df['BIG_ID'][0] == 12345678901234567890
+    assert df['NAME'].tolist() == ['a', None, 'c', 'd', 'e']
+    assert df['MODIFIED'].dtype == 'datetime64[ns]' and pd.isna(df['MODIFIED'][1])
+    assert df['OPT_ID'].dtype == 'float64'  # integer column with nulls
+
+
+def test_fetch_dataframe_no_rows():
+    df = fetch_dataframe(fake_connection(ORACLE, []), 'select * from t')
+
+    assert df.empty
+    assert list(df.columns) == ['ID', 'PRICE', 'BIG_ID', 'NAME', 'MODIFIED', 'OPT_ID']
+    assert df['MODIFIED'].dtype == 'datetime64[ns]'
+
+
+def test_fetch_chunks():
+    chunks = list(fetch_chunks(fake_connection(ORACLE, ROWS), 'select * from t', arraysize=2))
+
+    assert [len(df) for df in chunks] == [2, 2, 1]
+    assert chunks[2]['ID'].dtype == 'int64'
+
+
+def test_postgres_types():
+    description = [('ID', 23, None, None, None, None, None),
+                   ('TOTAL', 1700, None, None, None, None, None),
+                   ('NAME', 25, None, None, None, None, None)]
+
+    df = fetch_dataframe(fake_connection(description, [(1, 2.5, 'a'), (2, 3.0, 'b')]),
+                         'select * from t')
+
+    assert df.dtypes.astype(str).tolist() == ['int64', 'float64', 'object']
@@ -0,0 +1,29 @@
+import pandas as pd
+from datetime import datetime
+from ecat.history import export_history
+
+
+def write_export(history, export_date, df):
+    filename = history.get_partition(export_date)
+    filename.parent.mkdir(parents=True)
+    df.to_parquet(filename, index=False)
+
+
+def test_diff_ignores_type_only_changes(tmp_path):
+    history = export_history(directory=tmp_path)
+    old, new = datetime(2022, 2, 4), datetime(2022, 2, 5)
+    modified = pd.to_datetime(['2022-02-01', '2022-02-01', '2022-02-01'])
+
+    write_export(history, old, pd.DataFrame({
+        'PRODUCTCODE_ID': [1, 2, 3], 'DATE_LASTMODIFIED': modified,
+        'PRICE': [10, 20, 30], 'NAME': ['a', 'b', 'c']}))
+    write_export(history, new, pd.DataFrame({
+        'PRODUCTCODE_ID': [1, 2, 4], 'DATE_LASTMODIFIED': modified,
+        'PRICE': [10.0, 25.0, 40.0], 'NAME': pd.Categorical(['a', 'b', 'd'])}))
+
+    df_diff = history.diff(filename=None)
+
+    changes = df_diff.groupby('CHANGE')['PRODUCTCODE_ID'].unique().to_dict()
+    assert list(changes['ADDED']) == [4]
+    assert list(changes['REMOVED']) == [3]
+    assert list(changes['CHANGED']) == [2]
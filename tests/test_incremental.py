@@ -0,0 +1,69 @@
+import pandas as pd
+from ecat import incremental
+from ecat.incremental import analysis_cache
+from ecat.parallel import compare_frames
+from ecat.constants import COMMON_COLS
+
+
+def make_items(ids):
+    df = pd.DataFrame({col: [f'{col} {i}' for i in ids] for col in COMMON_COLS().get()})
+    df['PRODUCTCODE_ID'] = ids
+    df['BAXTER_PRODUCTCODE'] = [f'P{i}' for i in ids]
+    df['CATALOG_ID'] = 1
+    return df
+
+
+def make_data():
+    df_classroom = make_items([1, 2, 3, 4])
+    df_classroom['ARTICLE_STATUS'] = 1
+    df_product = make_items([2, 3, 4])
+    df_product['PRODUCT_NAME'] = 'changed'
+    df_p_product = make_items([3])
+    return df_classroom, df_product, df_p_product
+
+
+def spy_compare_frames(monkeypatch):
+    ''' Record the items compare_frames is (re)computed for '''
+
+    computed = []
+
+    def spy(df_classroom, df_product, df_p_product):
+        computed.append(sorted(df_classroom['PRODUCTCODE_ID']))
+        return compare_frames(df_classroom, df_product, df_p_product)
+
+    monkeypatch.setattr(incremental, 'compare_frames', spy)
+    return computed
+
+
+def assert_results_equal(results, expected):
+    for df, df_expected in zip(results, expected):
+        pd.testing.assert_frame_equal(df.reset_index(drop=True).astype(object),
+                                      df_expected.reset_index(drop=True).astype(object))
+
+
+def test_unchanged_items_are_reused(tmp_path, monkeypatch):
+    computed = spy_compare_frames(monkeypatch)
+    cache = analysis_cache(database='test', directory=tmp_path)
+
+    first = cache.compare(*make_data())
+    second = cache.compare(*make_data())
+
+    assert computed == [[1, 2, 3, 4]]  # second run: all items reused
+    assert_results_equal(second, first)
+    assert_results_equal(second, compare_frames(*make_data()))
+
+
+def test_changed_items_are_recomputed(tmp_path, monkeypatch):
+    computed = spy_compare_frames(monkeypatch)
+    cache = analysis_cache(database='test', directory=tmp_path)
+    cache.compare(*make_data())
+
+    df_classroom, df_product, df_p_product = make_data()
+    df_classroom.loc[df_classroom.PRODUCTCODE_ID == 2, 'PRODUCT_NAME'] = 'changed'
+    df_p_product.loc[df_p_product.PRODUCTCODE_ID == 3, 'TRADEMARK'] = 'new'
+
+    results = cache.compare(df_classroom, df_product, df_p_product)
+
+    assert computed[-1] == [2, 3]
+    assert_results_equal(results, compare_frames(df_classroom, df_product, df_p_product))
+    assert 2 not in results[1]['PRODUCTCODE_ID'].tolist()  # now equal to product
@@ -0,0 +1,47 @@
+import pandas as pd
+from ecat.constants import COMMON_COLS
+from ecat.parallel import partition, parallel_compare, compare_frames
+
+
+def make_items(ids):
+    df = pd.DataFrame({col: [f'{col} {i}' for i in ids] for col in COMMON_COLS().get()})
+    df['PRODUCTCODE_ID'] = ids
+    df['BAXTER_PRODUCTCODE'] = [f'P{i}' for i in ids]
+    df['CATALOG_ID'] = 1
+    return df
+
+
+def make_data():
+    df_classroom = make_items(list(range(1, 11)))
+    df_classroom['ARTICLE_STATUS'] = 1
+
+    # Every other item in product, each with one differing column
+    df_product = make_items([2, 4, 6, 8, 10])
+    df_product['PRODUCT_NAME'] = 'changed'
+    df_p_product = make_items([4, 8])
+
+    return df_classroom, df_product, df_p_product
+
+
+def test_partition_keeps_items_together():
+    df = make_items([1, 2, 3, 1, 2, 3, 4])
+    partitions = partition(df, 3)
+
+    assert sum(len(df_partition) for df_partition in partitions) == len(df)
+    for df_partition in partitions:
+        ids = set(df_partition['PRODUCTCODE_ID'])
+        assert all(ids.isdisjoint(other['PRODUCTCODE_ID']) for other in partitions
+                   if other is not df_partition)
+
+
+def test_serial_and_parallel_compare_equivalent():
+    serial = compare_frames(*make_data())
+    parallel = parallel_compare(*make_data(), processes=2)
+
+    for df_serial, df_parallel in zip(serial, parallel):
+        # Same values, categoricals of partitions may be concatenated as object
+        pd.testing.assert_frame_equal(df_serial.reset_index(drop=True).astype(object),
+                                      df_parallel.reset_index(drop=True).astype(object))
+
+    df_compare_product = serial[1]
+    assert sorted(df_compare_product['PRODUCTCODE_ID'].unique()) == [2, 4, 6, 8, 10]
@@ -0,0 +1,87 @@
+import pandas as pd
+from datetime import datetime
+from ecat import planner
+from ecat.planner import execution_plan, estimate_rows
+from ecat.classroom import artikel
+
+HEADER = ['PRODUCTCODE_ID', 'BAXTER_PRODUCTCODE', 'LAST_USER', 'DATE_APPROVED',
+          'DATE_LASTMODIFIED', 'ARTICLE_STATUS', 'GHX_STATUS', 'CSS_STATUS',
+          'THERAPIEGRUPPE', 'VOLUME_UOM']
+
+
+def write_export(path, rows):
+    lines = ['\t'.join(HEADER)]
+    for i in range(rows):
+        user = 'JDE_Upload_prd' if i % 2 else 'someone'
+        modified = '2022-02-04 20:02:53' if i % 3 else '2021-01-01 00:00:00'
+        lines.append('\t'.join([str(i + 1), f'P{i}', user, '2021-01-01 00:00:00',
+                                modified, '1', '0', '(null)', '2', 'ML' if i % 4 else 'L']))
+    filename = path / 'export_artikel_20220204200253.csv'
+    filename.write_text('\n'.join(lines) + '\n')
+    return filename
+
+
+def test_estimate_rows(tmp_path):
+    assert estimate_rows(write_export(tmp_path, 100)) == 100
+    assert estimate_rows(write_export(tmp_path, 5000), sample_size=4096) in range(4500, 5500)
+
+
+def test_small_file_plan(tmp_path, monkeypatch):
+    monkeypatch.setattr(planner, 'get_available_memory', lambda: 8 * 1024**3)
+    plan = execution_plan(write_export(tmp_path, 100))
+
+    assert plan.processes is None
+    assert plan.parallel_output is False
+    assert plan.fetch_size == 1000
+    assert plan.upload_batch_size == 1000
+    assert plan.chunk_size is None
+
+
+def test_large_file_plan(tmp_path, monkeypatch):
+    monkeypatch.setattr(planner, 'get_available_memory', lambda: 64 * 1024**3)
+    monkeypatch.setattr(planner, 'estimate_rows', lambda filename: 200000)
+    monkeypatch.setattr(planner.os, 'cpu_count', lambda: 16)
+    plan = execution_plan(write_export(tmp_path, 10))
+
+    assert plan.processes == 8
+    assert plan.parallel_output is True
+    assert plan.fetch_size == 5000
+    assert plan.upload_batch_size == 50000
+
+
+def test_out_of_memory_plan_reads_in_chunks(tmp_path, monkeypatch):
+    filename = write_export(tmp_path, 100)
+    monkeypatch.setattr(planner, 'get_available_memory', lambda: 1024)
+    plan = execution_plan(filename)
+
+    assert plan.processes is None
+    assert plan.chunk_size is not None
+
+
+def test_overrides(tmp_path):
+    plan = execution_plan(write_export(tmp_path, 100), processes=3, fetch_size=None)
+
+    assert plan.processes == 3
+    assert plan.fetch_size == 1000
+
+
+def test_chunked_read_matches_filter(tmp_path):
+    filename = write_export(tmp_path, 250)
+    filter_date = datetime(2022, 1, 1)
+
+    full = artikel(filename)
+    full.filter_data(filter_date=filter_date)
+    chunked = artikel(filename, chunk_size=40, filter_date=filter_date)
+    chunked.filter_data(filter_date=filter_date)
+
+    pd.testing.assert_frame_equal(full.df, chunked.df)
+
+
+def test_available_memory_from_meminfo(tmp_path):
+    meminfo = tmp_path / 'meminfo'
+    meminfo.write_text('MemTotal:       8000000 kB\n'
+                       'MemFree:        1000000 kB\n'
+                       'MemAvailable:   5000000 kB\n')
+
+    assert planner.get_available_memory(str(meminfo)) == 5000000 * 1024
+    assert planner.get_available_memory(str(tmp_path / 'missing')) is None
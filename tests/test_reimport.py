@@ -0,0 +1,51 @@
+import pytest
+from ecat.tables import reimport
+
+
+class fake_cursor():
+    ''' Minimal DB API cursor: canned query results, fails on a given statement '''
+
+    def __init__(self, results, fail_on=None):
+        self.results = results
+        self.fail_on = fail_on
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        if self.fail_on and self.fail_on in sql:
+            raise RuntimeError(f'failed: {sql}')
+        self.statements.append(sql)
+        self.rows = self.results.get('constraint' if 'user_constraints' in sql else
+                                     'index' if 'user_indexes' in sql else None, [])
+        return self
+
+    def fetchall(self):
+        return self.rows
+
+
+def make_reimport():
+    table = reimport.__new__(reimport)
+    table.table = 'reimport_data'
+    return table
+
+
+RESULTS = {'constraint': [('FK_1', 'ENABLED'), ('PK_1', 'DISABLED'), ('UK_1', 'ENABLED')],
+           'index': [('IX_1',), ('IX_2',)]}
+
+
+def test_defer_indexes_picks_up_disabled_constraints():
+    cursor = fake_cursor(RESULTS)
+    deferred = ([], [])
+    make_reimport()._defer_indexes(cursor, deferred)
+
+    assert deferred == (['IX_1', 'IX_2'], ['FK_1', 'PK_1', 'UK_1'])
+    assert not any('PK_1' in sql for sql in cursor.statements)
+
+
+def test_defer_indexes_records_partial_set():
+    cursor = fake_cursor(RESULTS, fail_on='disable constraint UK_1')
+    deferred = ([], [])
+
+    with pytest.raises(RuntimeError):
+        make_reimport()._defer_indexes(cursor, deferred)
+
+    assert deferred == ([], ['FK_1', 'PK_1'])
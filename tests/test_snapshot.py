@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from ecat.snapshot import product_snapshot
+
+
+def make_snapshot(tmp_path, database='eCatalogDEV'):
+    return product_snapshot(connection=None, database=database, directory=tmp_path)
+
+
+def products(ids, codes, modified):
+    return pd.DataFrame({'PRODUCTCODE_ID': ids, 'BAXTER_PRODUCTCODE': codes,
+                         'DESCRIPTION': [f'item {i}' for i in ids],
+                         'DATE_LASTMODIFIED': pd.to_datetime(modified)})
+
+
+def test_merge_replaces_changed_rows(tmp_path):
+    snapshot = make_snapshot(tmp_path)
+    df = products([1, 2], ['A', 'B'], ['2022-01-01', '2022-01-01'])
+    df_changed = products([2, 3], ['B', 'C'], ['2022-02-01', '2022-02-01'])
+    df_changed['DESCRIPTION'] = 'changed'
+
+    df_merged = snapshot._merge(df, df_changed).sort_values('PRODUCTCODE_ID')
+
+    assert df_merged['PRODUCTCODE_ID'].tolist() == [1, 2, 3]
+    assert df_merged['DESCRIPTION'].tolist() == ['item 1', 'changed', 'changed']
+
+
+def test_watermark_is_latest_modified(tmp_path):
+    snapshot = make_snapshot(tmp_path)
+    assert snapshot.get_watermark() is None
+
+    snapshot._save(products([1, 2], ['A', 'B'], ['2022-01-01', '2022-03-04 05:06:07']))
+
+    assert make_snapshot(tmp_path).get_watermark() == datetime(2022, 3, 4, 5, 6, 7)
+
+
+def test_lookup_float_ids(tmp_path):
+    snapshot = make_snapshot(tmp_path)
+    df = products([1, 2], ['A', 'B'], ['2022-01-01', '2022-01-01'])
+    df['PRODUCTCODE_ID'] = df['PRODUCTCODE_ID'].astype('float64')
+    snapshot._save(df)
+
+    df_lookup = make_snapshot(tmp_path).lookup("('2B', '3C')",
+                                               columns=['PRODUCTCODE_ID', 'DESCRIPTION'])
+
+    assert df_lookup.to_dict('list') == {'PRODUCTCODE_ID': [2.0], 'DESCRIPTION': ['item 2']}
+
+
+def test_lookup_empty_snapshot_keeps_columns(tmp_path):
+    df_lookup = make_snapshot(tmp_path).lookup(['1A'], columns=['PRODUCTCODE_ID', 'DESCRIPTION'])
+
+    assert df_lookup.empty
+    assert list(df_lookup.columns) == ['PRODUCTCODE_ID', 'DESCRIPTION']
+
+
+def test_snapshot_per_database(tmp_path):
+    make_snapshot(tmp_path)._save(products([1], ['A'], ['2022-03-04']))
+
+    other = make_snapshot(tmp_path, database='eCatalogPRD')
+    assert other.filename != make_snapshot(tmp_path).filename
+    assert other.get_watermark() is None
+    assert other.load().empty
+
+
+def test_save_mixed_type_column(tmp_path):
+    snapshot = make_snapshot(tmp_path)
+    df = products([1, 2], ['A', 'B'], ['2022-01-01', '2022-01-01'])
+    df['DESCRIPTION'] = ['text', 12]
+    snapshot._save(df)
+
+    assert make_snapshot(tmp_path).load()['DESCRIPTION'].tolist() == ['text', '12']
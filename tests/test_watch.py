@@ -0,0 +1,74 @@
+import pytest
+
+try:
+    import ecat.ecat
+    from ecat.watch import watcher
+except Exception as e:  # pypyodbc raises (not ImportError) without a system ODBC library
+    pytest.skip(f'ecat.db not importable: {e}', allow_module_level=True)
+
+
+class connection():
+    ''' Open connection stand-in, only ping() and close() are used by the watcher '''
+
+    def ping(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def make_watcher(tmp_path, monkeypatch, result):
+    ''' Watcher on one export file, classroom_run returns (or raises) result '''
+
+    calls = []
+
+    def classroom_run(filename, **kwargs):
+        calls.append(filename)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(ecat.ecat, 'classroom_run', classroom_run)
+
+    (tmp_path / 'inputs').mkdir()
+    export = tmp_path / 'inputs' / 'export_artikel_20220204200253.csv'
+    export.write_text('data')
+
+    w = watcher(directory=tmp_path / 'inputs', interval=0,
+                state_file=tmp_path / 'processed.json', max_attempts=2)
+    w.connection = connection()
+
+    return w, export, calls
+
+
+def test_success_is_recorded(tmp_path, monkeypatch):
+    w, export, calls = make_watcher(tmp_path, monkeypatch, result=True)
+    w.run(max_polls=3)
+
+    assert calls == [export]  # processed once, then skipped
+    assert w.processed.contains(export)
+    assert export.exists()
+
+
+def test_failure_is_retried_then_quarantined(tmp_path, monkeypatch):
+    w, export, calls = make_watcher(tmp_path, monkeypatch, result=False)
+
+    w.connection = connection()
+    w.run(max_polls=2)  # first poll: size check, second: attempt 1
+    assert export.exists()
+    assert not w.processed.contains(export)
+
+    w.connection = connection()
+    w.run(max_polls=1)  # attempt 2
+    assert len(calls) == 2
+    assert not export.exists()
+    assert (w.quarantine / export.name).exists()
+    assert not w.processed.contains(export)
+
+
+def test_unexpected_error_quarantines(tmp_path, monkeypatch):
+    w, export, calls = make_watcher(tmp_path, monkeypatch, result=ValueError('bad file'))
+    w.run(max_polls=2)
+
+    assert not export.exists()
+    assert (w.quarantine / export.name).exists()
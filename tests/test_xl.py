@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+import openpyxl
+from ecat.xl import excel_scheduler, read_excel_columns, _to_bool
+
+
+def test_scheduler_raises_worker_error(tmp_path):
+    df = pd.DataFrame({'A': [1, 2]})
+    (tmp_path / 'file').write_text('')
+
+    scheduler = excel_scheduler(processes=1)
+    scheduler.submit(df, filename=str(tmp_path / 'ok.xlsx'), date_prefix=False)
+    scheduler.submit(df, filename=str(tmp_path / 'file' / 'bad.xlsx'), date_prefix=False)
+
+    with pytest.raises(Exception):
+        scheduler.close()
+
+    assert (tmp_path / 'ok.xlsx').exists()
+    assert scheduler.executor is None
+
+
+def write_workbook(filename, rows):
+    wb = openpyxl.Workbook()
+    for row in rows:
+        wb.active.append(row)
+    wb.save(filename)
+
+
+def test_read_excel_columns_hand_edited(tmp_path):
+    filename = tmp_path / 'analysis.xlsx'
+    write_workbook(filename, [
+        ['PRODUCTCODE ID', 'PRODUCT_NAME', 'ARTICLE STATUS', 'PRODUCT', 'P_PRODUCT'],
+        [1, 'a', 10260, True, 'x'],
+        [None, None, None, None, None],  # empty row, skipped
+        [2, 'b', 10264, 'FALSE', None],
+        [3, 'c', 10260, 1, ' Yes '],
+        [4, 'd', 10260, 'no', 0]])
+
+    df = read_excel_columns(filename, columns=['PRODUCTCODE_ID', 'ARTICLE_STATUS',
+                                               'PRODUCT', 'P_PRODUCT'],
+                            bool_cols=['PRODUCT', 'P_PRODUCT'])
+
+    assert list(df.columns) == ['PRODUCTCODE_ID', 'ARTICLE_STATUS', 'PRODUCT', 'P_PRODUCT']
+    assert df['PRODUCTCODE_ID'].tolist() == [1, 2, 3, 4]
+    assert df['PRODUCT'].tolist() == [True, False, True, False]
+    assert df['P_PRODUCT'].tolist() == [True, False, True, False]
+
+
+def test_read_excel_columns_missing_column(tmp_path):
+    filename = tmp_path / 'analysis.xlsx'
+    write_workbook(filename, [['PRODUCTCODE_ID'], [1]])
+
+    with pytest.raises(KeyError):
+        read_excel_columns(filename, columns=['PRODUCTCODE_ID', 'PRODUCT'])
+
+
+def test_to_bool():
+    assert [_to_bool(value) for value in ('TRUE', 'wahr', 'x', '1', 1, True)] == [True] * 6
+    assert [_to_bool(value) for value in ('false', 'no', '', '0', 0, None)] == [False] * 6